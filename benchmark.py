@@ -0,0 +1,208 @@
+"""Times the board engine and the main screen drawing and compares them with a saved baseline.
+
+Example: python benchmark.py --save-baseline, then after a change: python benchmark.py
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import timeit
+from collections.abc import Callable
+from typing import Any
+
+# Frames are drawn without a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from src.bitboard import DIRECTIONS, build_tables
+from src.board import GameBoard
+from src.logics import quick_copy
+
+FIXTURE_SEED = 2048
+FIXTURE_SIZE = 256  # Positions every benchmark goes through
+BASELINE_PATH = "benchmark_baseline.json"
+
+# Receives the score of the moves like the App does
+class Scores:
+    def __init__(self) -> None:
+        self.score = self.old_score = self.delta = 0
+
+# Returns positions from seeded games of random moves, from the opening to full boards
+def make_fixtures(seed: int = FIXTURE_SEED, size: int = FIXTURE_SIZE) -> list[list[list[int]]]:
+    rng = random.Random(seed)
+    positions: list[list[list[int]]] = []
+    while len(positions) < size:
+        board = GameBoard(rng=rng)
+        while board.are_there_zeros() and board.can_move() and len(positions) < size:
+            positions.append(quick_copy(board))
+            board.move(rng.choice(DIRECTIONS))
+            board.insert_in_mas()
+    return positions
+
+# Returns a board holding a copy of the position, with its own seeded spawns
+def fixture_board(mas: list[list[int]], seed: int) -> GameBoard:
+    board = GameBoard(seed=seed)
+    board.get_mas = [list(row) for row in mas]
+    return board
+
+# Returns the benchmarks by name; each runs once over every fixture position
+def make_benchmarks(fixtures: list[list[list[int]]], draw: bool = True) -> dict[str, Callable[[], None]]:
+    # Boards only read by the benchmarks, and boards the moves and spawns change
+    boards = [fixture_board(mas, index) for index, mas in enumerate(fixtures)]
+    pairs = [(fixture_board(mas, index), mas) for index, mas in enumerate(fixtures)]
+    scores = Scores()
+    benchmarks: dict[str, Callable[[], None]] = {}
+
+    # A move changes the board, so every call starts again from the fixture; restore_rows times that part alone
+    def restore_rows() -> None:
+        for board, mas in pairs:
+            board.get_mas = [list(row) for row in mas]
+
+    benchmarks["restore_rows"] = restore_rows
+    for direction in DIRECTIONS:
+        name = f"move_{direction.lower()}"
+
+        def move(name: str = name) -> None:
+            for board, mas in pairs:
+                board.get_mas = [list(row) for row in mas]
+                getattr(board, name)(scores)
+
+        benchmarks[name] = move
+
+    # The checks are cached until the board changes, so they are timed on a freshly restored board
+    def can_move() -> None:
+        for board, mas in pairs:
+            board.get_mas = [list(row) for row in mas]
+            board.can_move()
+
+    def are_there_zeros() -> None:
+        for board, mas in pairs:
+            board.get_mas = [list(row) for row in mas]
+            board.are_there_zeros()
+
+    def insert_in_mas() -> None:
+        for board, mas in pairs:
+            board.get_mas = [list(row) for row in mas]
+            board.is_board_move = True
+            board.insert_in_mas()
+
+    # One turn of the game loop: a move, the new tile, and the checks of App.run and App.is_victory
+    def turn() -> None:
+        for index, (board, mas) in enumerate(pairs):
+            board.get_mas = [list(row) for row in mas]
+            board.move(DIRECTIONS[index % len(DIRECTIONS)])
+            board.insert_in_mas()
+            board.are_there_zeros()
+            board.can_move()
+            board.max_tile
+
+    def copy() -> None:
+        for board in boards:
+            quick_copy(board)
+
+    benchmarks.update(
+        can_move=can_move, are_there_zeros=are_there_zeros, insert_in_mas=insert_in_mas, turn=turn, quick_copy=copy,
+    )
+    if draw:
+        benchmarks["draw_main"] = make_draw_benchmark(fixtures)
+    return benchmarks
+
+# Draws the whole main screen once per fixture position, like the first frame of a game
+def make_draw_benchmark(fixtures: list[list[list[int]]]) -> Callable[[], None]:
+    import pygame as pg
+
+    from src.main import App
+
+    pg.init()
+    app = App()
+    app.username = "benchmark"
+    app.draw_main()  # Decodes the images and fills the tile atlas before timing
+
+    def draw_main() -> None:
+        for mas in fixtures:
+            app.board.get_mas = mas
+            app.draw_main()
+
+    return draw_main
+
+# Returns the best time of one operation in microseconds over repeat runs
+def measure(benchmark: Callable[[], None], operations: int, repeat: int) -> float:
+    timer = timeit.Timer(benchmark)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / (number * operations) * 1e6
+
+# Returns the benchmarks slower than the baseline by more than tolerance as (name, baseline, current)
+def compare(results: dict[str, float], baseline: dict[str, float], tolerance: float) -> list[tuple[str, float, float]]:
+    return [
+        (name, baseline[name], current)
+        for name, current in results.items()
+        if name in baseline and current > baseline[name] * (1 + tolerance)
+    ]
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="runs of each benchmark, the best one counts")
+    parser.add_argument("--only", nargs="+", metavar="NAME", help="run only these benchmarks")
+    parser.add_argument("--no-draw", action="store_true", help="skip the benchmarks that need pygame")
+    parser.add_argument("--output", help="JSON file for the results, printed if not given")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="JSON file with the results to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="slowdown reported as a regression")
+    return parser.parse_args(argv)
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    build_tables()
+    fixtures = make_fixtures()
+    benchmarks = make_benchmarks(fixtures, draw=not args.no_draw)
+    unknown = set(args.only or ()) - set(benchmarks)
+    if unknown:
+        print(f"Unknown benchmarks: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+
+    results: dict[str, float] = {}
+    for name, benchmark in benchmarks.items():
+        if args.only and name not in args.only:
+            continue
+        results[name] = measure(benchmark, len(fixtures), args.repeat)
+        print(f"{name:<16} {results[name]:10.3f} us", file=sys.stderr)
+
+    report: dict[str, Any] = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": FIXTURE_SEED,
+        "positions": len(fixtures),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "unit": "us",
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            file.write(text + "\n")
+        print(f"baseline written to {args.baseline}", file=sys.stderr)
+        return 0
+    try:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+    except FileNotFoundError:
+        print(f"no baseline at {args.baseline}, store one with --save-baseline", file=sys.stderr)
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    for name, before, after in regressions:
+        print(f"regression: {name} {before:.3f} us -> {after:.3f} us ({after / before - 1:+.0%})", file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
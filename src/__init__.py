@@ -1,18 +1,40 @@
-import pygame as pg
+# The window, audio and database are only set up by start(), and each of them only when it
+# is first needed, so importing src.board or src.bitboard stays cheap for headless tools.
+# Set TTFE_STARTUP_TIMING=1 to print how long each step of the start took.
+import os
+import sys
+import time
 
-from src.config import CAPTION, ICON_PATH, resource_path
-from src.main import App
+STARTUP_TIMING_ENV = "TTFE_STARTUP_TIMING"
 
-pg.init()
-pg.display.set_caption(CAPTION)
+def start() -> None:
+    marks = [("start", time.perf_counter())]
 
-try:
-    icon = pg.image.load(resource_path(ICON_PATH))
-    pg.display.set_icon(icon)
-except FileNotFoundError:
-    pass
+    import pygame as pg
 
-GameApp2048 = App()
+    from src.config import CAPTION, ICON_PATH, resource_path
+    from src.main import App
 
-def start() -> None:
-    GameApp2048.run()
\ No newline at end of file
+    marks.append(("imports", time.perf_counter()))
+    # Only the display; fonts are loaded when first drawn and the mixer when music first plays
+    pg.display.init()
+    pg.display.set_caption(CAPTION)
+
+    try:
+        icon = pg.image.load(resource_path(ICON_PATH))
+        pg.display.set_icon(icon)
+    except FileNotFoundError:
+        pass
+    marks.append(("display", time.perf_counter()))
+
+    app = App()
+    marks.append(("window and tiles", time.perf_counter()))
+    if os.environ.get(STARTUP_TIMING_ENV):
+        report_startup(marks)
+    app.run()
+
+# Prints the time of every startup step and the total
+def report_startup(marks: list[tuple[str, float]]) -> None:
+    for (_, previous), (name, moment) in zip(marks, marks[1:]):
+        print(f"{name:<18} {(moment - previous) * 1000:8.1f} ms", file=sys.stderr)
+    print(f"{'total':<18} {(marks[-1][1] - marks[0][1]) * 1000:8.1f} ms", file=sys.stderr)
@@ -0,0 +1,229 @@
+from __future__ import annotations
+# Expectimax player for the 4x4 board, searching on the packed form of src.bitboard.
+# Player moves are max nodes, tile spawns are chance nodes with the odds of
+# GameBoard.insert_2_or_4: a 2 with probability 0.9 and a 4 with probability 0.1.
+
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Iterable
+
+from src import bitboard
+from src.bitboard import DIRECTIONS, MOVES, ROW_MASK, transpose
+from src.symmetry import canonical
+
+PROBABILITY_2 = 0.9
+PROBABILITY_4 = 0.1
+SPAWN_MEAN = 2 * PROBABILITY_2 + 4 * PROBABILITY_4  # Average value a spawn adds to the board
+
+# Weights of the row heuristic
+LOST_PENALTY = 200000.0
+MONOTONICITY_POWER = 4.0
+MONOTONICITY_WEIGHT = 47.0
+SUM_POWER = 3.5
+SUM_WEIGHT = 11.0
+MERGES_WEIGHT = 700.0
+EMPTY_WEIGHT = 270.0
+
+# Heuristic value of every packed row, filled once by build_heuristic().
+ROW_HEURISTIC: list[float] = []
+
+# Scores one row: empty cells and possible merges are good, big tiles out of order are bad.
+# The value does not change when the row is reversed, so the board heuristic is the same
+# for all rotations and reflections of a board.
+def _row_heuristic(row: int) -> float:
+    ranks = [(row >> (4 * i)) & 0xF for i in range(4)]
+    empty = ranks.count(0)
+    merges = 0
+    previous = 0
+    counter = 0
+    for rank in ranks:
+        if rank == 0:
+            continue
+        if previous == rank:
+            counter += 1
+        elif counter > 0:
+            merges += 1 + counter
+            counter = 0
+        previous = rank
+    if counter > 0:
+        merges += 1 + counter
+    monotonicity_left = 0.0
+    monotonicity_right = 0.0
+    for i in range(1, 4):
+        before = ranks[i - 1] ** MONOTONICITY_POWER
+        after = ranks[i] ** MONOTONICITY_POWER
+        if ranks[i - 1] > ranks[i]:
+            monotonicity_left += before - after
+        else:
+            monotonicity_right += after - before
+    total = sum(rank ** SUM_POWER for rank in ranks)
+    return (
+        LOST_PENALTY
+        + EMPTY_WEIGHT * empty
+        + MERGES_WEIGHT * merges
+        - MONOTONICITY_WEIGHT * min(monotonicity_left, monotonicity_right)
+        - SUM_WEIGHT * total
+    )
+
+# Builds the heuristic table; does nothing if it is already built.
+def build_heuristic() -> None:
+    if not ROW_HEURISTIC:
+        ROW_HEURISTIC.extend(_row_heuristic(row) for row in range(65536))
+
+# Returns the heuristic value of a packed board: its rows plus its columns.
+def evaluate(board: int) -> float:
+    table = ROW_HEURISTIC
+    columns = transpose(board)
+    return (
+        table[board & ROW_MASK]
+        + table[(board >> 16) & ROW_MASK]
+        + table[(board >> 32) & ROW_MASK]
+        + table[board >> 48]
+        + table[columns & ROW_MASK]
+        + table[(columns >> 16) & ROW_MASK]
+        + table[(columns >> 32) & ROW_MASK]
+        + table[columns >> 48]
+    )
+
+# Returns the bit offsets of the empty cells of a packed board.
+def empty_cells(board: int) -> list[int]:
+    return [shift for shift in range(0, 64, 4) if not (board >> shift) & 0xF]
+
+# Estimates the moves left before the tiles of a board add up to target: every move spawns
+# one tile, so the sum grows by SPAWN_MEAN a move. Once the sum has passed target, the next
+# power of two is the target. Never less than one move.
+def expected_moves_left(mas: Iterable[list[int]], target: int = 2048) -> float:
+    total = sum(value for row in mas for value in row)
+    while target <= total:
+        target *= 2
+    return max(1.0, (target - total) / SPAWN_MEAN)
+
+# Bounded cache of chance node values, dropping the least recently used entry when full
+class TranspositionTable:
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.entries: OrderedDict[int, tuple[int, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    # Returns the cached value if it was searched at least as deep as requested
+    def get(self, board: int, depth: int) -> float | None:
+        entry = self.entries.get(board)
+        if entry is None or entry[0] < depth:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(board)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, board: int, depth: int, value: float) -> None:
+        self.entries[board] = (depth, value)
+        self.entries.move_to_end(board)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.hits = self.misses = 0
+
+# Raised inside a search when its abort check returns True
+class SearchAborted(Exception):
+    pass
+
+# Expectimax search with depth control, probability cutoff and a transposition table
+class Expectimax:
+    # depth is the number of player moves looked ahead. Chance nodes reached with a
+    # probability below prob_cutoff are evaluated without searching further. With symmetric,
+    # rotations and mirror images of a board share one cache entry.
+    def __init__(
+        self,
+        depth: int = 2,
+        prob_cutoff: float = 1e-3,
+        cache_size: int = 200_000,
+        symmetric: bool = True,
+    ) -> None:
+        if depth < 1:
+            msg = "Invalid argument depth, must be at least 1"
+            raise ValueError(msg)
+        self.depth = depth
+        self.prob_cutoff = prob_cutoff
+        self.table = TranspositionTable(cache_size)
+        self.symmetric = symmetric
+        # Checked at every chance node that is searched; the search raises SearchAborted once it returns True
+        self.abort: Callable[[], bool] | None = None
+        bitboard.build_tables()
+        build_heuristic()
+
+    # Returns the best direction for a board (a GameBoard, its rows or a packed board),
+    # or None if no move changes the board.
+    def best_move(self, board: int | Iterable[list[int]]) -> str | None:
+        if not isinstance(board, int):
+            board = bitboard.pack(board)
+        best_direction = None
+        best_value = float("-inf")
+        for direction in DIRECTIONS:
+            new_board, score = MOVES[direction](board)
+            if new_board == board:
+                continue
+            value = self._chance_node(new_board, self.depth - 1, 1.0) + score
+            if value > best_value:
+                best_direction, best_value = direction, value
+        return best_direction
+
+    # Searches one move deeper at a time, from depth 1 up to max_depth, until seconds have
+    # passed; returns the move of the deepest search that finished. Depth 1 never checks
+    # the clock, so there is always a move when the board has one.
+    def best_move_timed(self, board: int | Iterable[list[int]], seconds: float, max_depth: int = 8) -> str | None:
+        if not isinstance(board, int):
+            board = bitboard.pack(board)
+        deadline = time.perf_counter() + seconds
+        depth, abort = self.depth, self.abort
+        self.abort = lambda: time.perf_counter() >= deadline or (abort is not None and abort())
+        best_direction = None
+        try:
+            for search_depth in range(1, max_depth + 1):
+                self.depth = search_depth
+                try:
+                    direction = self.best_move(board)
+                except SearchAborted:
+                    break
+                best_direction = direction
+                if direction is None or time.perf_counter() >= deadline:
+                    break
+        finally:
+            self.depth, self.abort = depth, abort
+        return best_direction
+
+    def _max_node(self, board: int, depth: int, probability: float) -> float:
+        best = 0.0
+        for move in MOVES.values():
+            new_board, score = move(board)
+            if new_board != board:
+                best = max(best, self._chance_node(new_board, depth - 1, probability) + score)
+        return best
+
+    def _chance_node(self, board: int, depth: int, probability: float) -> float:
+        if depth <= 0 or probability < self.prob_cutoff:
+            return evaluate(board)
+        # Rotations and mirror images have the same value, so they can share one entry
+        key = canonical(board) if self.symmetric else board
+        cached = self.table.get(key, depth)
+        if cached is not None:
+            return cached
+        if self.abort is not None and self.abort():
+            raise SearchAborted
+        cells = empty_cells(board)
+        if not cells:
+            return evaluate(board)
+        probability /= len(cells)
+        total = 0.0
+        for shift in cells:
+            total += PROBABILITY_2 * self._max_node(board | (1 << shift), depth, probability * PROBABILITY_2)
+            total += PROBABILITY_4 * self._max_node(board | (2 << shift), depth, probability * PROBABILITY_4)
+        value = total / len(cells)
+        self.table.put(key, depth, value)
+        return value
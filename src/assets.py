@@ -0,0 +1,56 @@
+from __future__ import annotations
+# Cache of decoded images, converted to the display pixel format and kept for every size asked for.
+
+import threading
+from collections.abc import Iterable
+from pathlib import Path
+
+import pygame as pg
+
+from src.config import resource_path
+
+AssetRequest = tuple[Path, "tuple[int, int] | None"]
+
+class AssetManager:
+    def __init__(self) -> None:
+        self._decoded: dict[Path, pg.Surface] = {}  # As read from disk
+        self._prepared: dict[AssetRequest, pg.Surface] = {}  # Scaled in the background, not converted yet
+        self._ready: dict[AssetRequest, pg.Surface] = {}  # Scaled and converted, ready to blit
+        self._warm_up: threading.Thread | None = None
+
+    # Returns the image at path, scaled to size if given, in the display pixel format
+    def image(self, path: Path, size: tuple[int, int] | None = None) -> pg.Surface:
+        key = (resource_path(path), None if size is None else tuple(size))
+        surface = self._ready.get(key)
+        if surface is None:
+            surface = self._prepared.pop(key, None)
+            if surface is None:
+                surface = self._scale(*key)
+            # Converting needs the display, so it is always done here rather than while warming up
+            surface = surface.convert_alpha() if key[0].suffix == ".png" else surface.convert()
+            self._ready[key] = surface
+        return surface
+
+    # Starts decoding and scaling the requested images on a background thread
+    def warm_up(self, requests: Iterable[AssetRequest]) -> None:
+        if self._warm_up is not None and self._warm_up.is_alive():
+            return
+        keys = [(resource_path(path), None if size is None else tuple(size)) for path, size in requests]
+        self._warm_up = threading.Thread(target=self._prepare, args=(keys,), name="asset-warm-up", daemon=True)
+        self._warm_up.start()
+
+    def _prepare(self, keys: list[AssetRequest]) -> None:
+        for key in keys:
+            if key in self._ready or key in self._prepared:
+                continue
+            try:
+                self._prepared[key] = self._scale(*key)
+            except (FileNotFoundError, pg.error):
+                # Left for image() to raise on the main thread when the asset is used
+                continue
+
+    def _scale(self, path: Path, size: tuple[int, int] | None) -> pg.Surface:
+        surface = self._decoded.get(path)
+        if surface is None:
+            surface = self._decoded[path] = pg.image.load(path)
+        return surface if size is None else pg.transform.scale(surface, size)
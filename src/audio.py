@@ -0,0 +1,95 @@
+from __future__ import annotations
+# Background music. Track files are read into memory in the background at startup, and
+# loading the decoder and switching tracks happens on a worker thread, so the game loop
+# never waits for the disk or the audio device.
+
+import io
+import queue
+import sys
+import threading
+from pathlib import Path
+
+import pygame as pg
+
+STOP = None  # Request to stop the music
+
+class AudioManager:
+    def __init__(self, tracks: dict[str, str]) -> None:
+        self.tracks = tracks
+        self.current: str | None = None  # Track asked for last, None when stopped
+        self._data: dict[str, bytes | None] = {}  # Contents of each track, None if it could not be read
+        self._preloaded = threading.Event()
+        self._requests: queue.Queue[str | None] = queue.Queue()
+        self._worker: threading.Thread | None = None
+        self._file: io.BytesIO | None = None  # The mixer streams from it while the track plays
+        self._available = True  # Turned off for good when there is no audio device
+
+    # Starts reading every track into memory in the background
+    def preload(self) -> None:
+        if self._worker is None:
+            threading.Thread(target=self._read_tracks, name="audio-preload", daemon=True).start()
+            self._worker = threading.Thread(target=self._run, name="audio", daemon=True)
+            self._worker.start()
+
+    # Plays a track in a loop; does nothing if it is already the one playing
+    def play(self, track_id: str) -> None:
+        if track_id not in self.tracks:
+            print(f"Music with ID '{track_id}' not found.")
+            return
+        if track_id == self.current:
+            return
+        self.current = track_id
+        self._request(track_id)
+
+    def stop(self) -> None:
+        if self.current is not None:
+            self.current = None
+            self._request(STOP)
+
+    def _request(self, track_id: str | None) -> None:
+        self.preload()
+        self._requests.put(track_id)
+
+    def _read_tracks(self) -> None:
+        for track_id, path in self.tracks.items():
+            try:
+                self._data[track_id] = Path(path).read_bytes()
+            except OSError as exc:
+                print(f"Music '{track_id}' is not available: {exc}", file=sys.stderr)
+                self._data[track_id] = None
+        self._preloaded.set()
+
+    # Body of the worker thread: carries out the newest request, the ones before it are outdated
+    def _run(self) -> None:
+        while True:
+            track_id = self._requests.get()
+            while not self._requests.empty():
+                track_id = self._requests.get_nowait()
+            if self._available and self._init_mixer():
+                self._switch(track_id)
+
+    def _init_mixer(self) -> bool:
+        if pg.mixer.get_init():
+            return True
+        try:
+            pg.mixer.init()
+        except pg.error as exc:
+            print(f"No sound: {exc}", file=sys.stderr)
+            self._available = False
+            return False
+        return True
+
+    def _switch(self, track_id: str | None) -> None:
+        pg.mixer.music.stop()
+        if track_id is None:
+            return
+        self._preloaded.wait()
+        data = self._data.get(track_id)
+        if data is None:
+            return
+        try:
+            self._file = io.BytesIO(data)
+            pg.mixer.music.load(self._file, Path(self.tracks[track_id]).suffix[1:])
+            pg.mixer.music.play(-1)
+        except pg.error as exc:
+            print(f"Music '{track_id}' cannot be played: {exc}", file=sys.stderr)
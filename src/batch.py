@@ -0,0 +1,139 @@
+from __future__ import annotations
+# Vectorised engine that steps many 4x4 boards at once with NumPy.
+# Boards are stored as log2 exponents, the same cells the packed form in
+# src.bitboard uses, and moved with its row tables.
+
+import numpy as np
+
+from src import bitboard
+from src.bitboard import DIRECTIONS, MAX_EXPONENT
+
+_TABLES: dict[str, np.ndarray] = {}
+
+# Returns the row tables of src.bitboard as NumPy arrays, converting them once.
+def _tables() -> tuple[np.ndarray, np.ndarray]:
+    if not _TABLES:
+        bitboard.build_tables()
+        _TABLES["left"] = np.array(bitboard.ROW_LEFT, dtype=np.uint16)
+        _TABLES["score"] = np.array(bitboard.ROW_SCORE, dtype=np.int64)
+    return _TABLES["left"], _TABLES["score"]
+
+# Returns a view of the cells in which the given direction is a move to the left.
+def _orient(cells: np.ndarray, direction: int) -> np.ndarray:
+    name = DIRECTIONS[direction]
+    if name == "RIGHT":
+        return cells[:, :, ::-1]
+    if name == "UP":
+        return cells.transpose(0, 2, 1)
+    if name == "DOWN":
+        return cells.transpose(0, 2, 1)[:, :, ::-1]
+    return cells
+
+# Inverse of _orient.
+def _restore(cells: np.ndarray, direction: int) -> np.ndarray:
+    name = DIRECTIONS[direction]
+    if name == "DOWN":
+        return cells[:, :, ::-1].transpose(0, 2, 1)
+    return _orient(cells, direction)
+
+# Moves every board of cells in one direction, returns the new cells and the scores gained.
+def slide(cells: np.ndarray, direction: int) -> tuple[np.ndarray, np.ndarray]:
+    left, scores = _tables()
+    rows = _orient(cells, direction).astype(np.uint16)
+    keys = rows[..., 0] | (rows[..., 1] << 4) | (rows[..., 2] << 8) | (rows[..., 3] << 12)
+    moved = left[keys]
+    new_rows = np.stack([(moved >> (4 * i)) & 0xF for i in range(4)], axis=-1).astype(np.uint8)
+    return np.ascontiguousarray(_restore(new_rows, direction)), scores[keys].sum(axis=1)
+
+# Returns a mask of boards on which no move changes anything.
+# Two 32768 tiles do not merge, see bitboard.build_tables.
+def no_moves(cells: np.ndarray) -> np.ndarray:
+    empty = (cells == 0).any(axis=(1, 2))
+    mergeable = cells < MAX_EXPONENT
+    pairs_in_rows = ((cells[:, :, 1:] == cells[:, :, :-1]) & mergeable[:, :, 1:]).any(axis=(1, 2))
+    pairs_in_columns = ((cells[:, 1:, :] == cells[:, :-1, :]) & mergeable[:, 1:, :]).any(axis=(1, 2))
+    return ~(empty | pairs_in_rows | pairs_in_columns)
+
+# N boards held in one array and played in lockstep
+class BoardBatch:
+    cells: np.ndarray  # shape (N, 4, 4), uint8 exponents, 0 for an empty cell
+    score: np.ndarray  # shape (N,), int64
+    over: np.ndarray  # shape (N,), bool
+
+    def __init__(self, count: int, seed: int | None = None, rng: np.random.Generator | None = None) -> None:
+        self.rng = rng if rng is not None else np.random.default_rng(seed)
+        self.cells = np.zeros((count, 4, 4), dtype=np.uint8)
+        self.score = np.zeros(count, dtype=np.int64)
+        self.over = np.zeros(count, dtype=bool)
+        # Every new board starts with two tiles, like GameBoard
+        everything = np.ones(count, dtype=bool)
+        self.spawn(everything)
+        self.spawn(everything)
+
+    # Builds a batch from list boards such as GameBoard.get_mas
+    @classmethod
+    def from_boards(cls, boards: list[list[list[int]]], seed: int | None = None) -> BoardBatch:
+        batch = cls(0, seed)
+        values = np.array(boards, dtype=np.int64).reshape(-1, 4, 4)
+        exponents = np.zeros(values.shape, dtype=np.uint8)
+        nonzero = values > 0
+        exponents[nonzero] = np.log2(values[nonzero]).astype(np.uint8)
+        batch.cells = exponents
+        batch.score = np.zeros(len(values), dtype=np.int64)
+        batch.over = no_moves(exponents)
+        return batch
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    # Returns one board in the list form used by GameBoard
+    def board(self, index: int) -> list[list[int]]:
+        return [[1 << int(e) if e else 0 for e in row] for row in self.cells[index]]
+
+    # Returns the largest tile value of every board
+    def max_tile(self) -> np.ndarray:
+        exponents = self.cells.reshape(len(self), 16).max(axis=1).astype(np.int64)
+        return np.where(exponents > 0, 1 << exponents, 0)
+
+    # Returns an (N, 4) mask of which directions change each board, in DIRECTIONS order
+    def legal_moves(self) -> np.ndarray:
+        legal = np.empty((len(self), len(DIRECTIONS)), dtype=bool)
+        for direction in range(len(DIRECTIONS)):
+            new_cells, _ = slide(self.cells, direction)
+            legal[:, direction] = (new_cells != self.cells).any(axis=(1, 2))
+        return legal & ~self.over[:, None]
+
+    # Puts a 2 (90%) or a 4 (10%) into a uniformly chosen empty cell of every masked board
+    def spawn(self, mask: np.ndarray) -> None:
+        flat = self.cells.reshape(len(self), 16)
+        empty = flat == 0
+        mask = mask & empty.any(axis=1)
+        count = int(mask.sum())
+        if count == 0:
+            return
+        keys = self.rng.random((count, flat.shape[1]))
+        keys[~empty[mask]] = -1.0
+        cells = keys.argmax(axis=1)
+        values = np.where(self.rng.random(count) <= 0.90, 1, 2).astype(np.uint8)
+        flat[np.nonzero(mask)[0], cells] = values
+
+    # Applies one move per board (indices into DIRECTIONS) and spawns on the boards that moved.
+    # Returns the score gained, the moved mask and the game-over mask.
+    def step(self, moves: np.ndarray, spawn: bool = True) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        moves = np.asarray(moves)
+        gained = np.zeros(len(self), dtype=np.int64)
+        moved = np.zeros(len(self), dtype=bool)
+        for direction in range(len(DIRECTIONS)):
+            selected = np.nonzero((moves == direction) & ~self.over)[0]
+            if len(selected) == 0:
+                continue
+            before = self.cells[selected]
+            after, score = slide(before, direction)
+            self.cells[selected] = after
+            gained[selected] = score
+            moved[selected] = (after != before).any(axis=(1, 2))
+        self.score += gained
+        if spawn:
+            self.spawn(moved)
+        self.over |= no_moves(self.cells)
+        return gained, moved, self.over.copy()
@@ -0,0 +1,192 @@
+from __future__ import annotations
+# Packed 4x4 board: a 64-bit integer holding one 4-bit log2 exponent per cell.
+# Cell (x, y) lives in nibble 4 * x + y, so row x occupies bits 16 * x .. 16 * x + 15
+# with column 0 in the lowest nibble. An empty cell is the exponent 0.
+
+from collections.abc import Iterable
+
+ROW_MASK = 0xFFFF
+MAX_EXPONENT = 15  # The largest tile that fits in a nibble is 2 ** 15 = 32768; two of them never merge.
+
+# Lookup tables indexed by a packed 16-bit row, filled once by build_tables().
+ROW_LEFT: list[int] = []
+ROW_RIGHT: list[int] = []
+ROW_SCORE: list[int] = []
+ROW_SCORE_RIGHT: list[int] = []
+
+# Slides a line of tile values towards index 0 and merges equal neighbours once.
+def merge_line(line: list[int]) -> tuple[list[int], int]:
+    tiles = [value for value in line if value != 0]
+    result = []
+    score = 0
+    i = 0
+    while i < len(tiles):
+        if i + 1 < len(tiles) and tiles[i] == tiles[i + 1]:
+            result.append(tiles[i] * 2)
+            score += tiles[i] * 2
+            i += 2
+        else:
+            result.append(tiles[i])
+            i += 1
+    result.extend([0] * (len(line) - len(result)))
+    return result, score
+
+# Reverses the order of the four nibbles of a packed row.
+def reverse_row(row: int) -> int:
+    return ((row & 0xF) << 12) | ((row & 0xF0) << 4) | ((row >> 4) & 0xF0) | (row >> 12)
+
+# Builds the row tables; does nothing if they are already built.
+def build_tables() -> None:
+    if ROW_LEFT:
+        return
+    left = [0] * 65536
+    score = [0] * 65536
+    for row in range(65536):
+        tiles = [e for e in ((row >> (4 * i)) & 0xF for i in range(4)) if e]
+        packed = gained = 0
+        i = shift = 0
+        # Like merge_line on the exponents, but 65536 does not fit in a nibble, so 32768 tiles stay apart
+        while i < len(tiles):
+            if i + 1 < len(tiles) and tiles[i] == tiles[i + 1] < MAX_EXPONENT:
+                packed |= (tiles[i] + 1) << shift
+                gained += 1 << (tiles[i] + 1)
+                i += 2
+            else:
+                packed |= tiles[i] << shift
+                i += 1
+            shift += 4
+        left[row] = packed
+        score[row] = gained
+    ROW_LEFT.extend(left)
+    ROW_SCORE.extend(score)
+    ROW_RIGHT.extend(reverse_row(left[reverse_row(row)]) for row in range(65536))
+    ROW_SCORE_RIGHT.extend(score[reverse_row(row)] for row in range(65536))
+
+# Returns the packed form of a 4x4 list board.
+# Other sizes and tiles of 32768 or more are refused with ValueError. A move can still make a 32768,
+# which the tables never merge with another one, so GameBoard moves such boards on a Grid.
+def pack(mas: Iterable[list[int]]) -> int:
+    board = 0
+    shift = 0
+    for row in mas:
+        if len(row) != 4 or shift == 64:
+            msg = "Only 4x4 boards can be packed"
+            raise ValueError(msg)
+        for value in row:
+            if value:
+                exponent = value.bit_length() - 1
+                if value != 1 << exponent or not 0 < exponent < MAX_EXPONENT:
+                    msg = f"Tile {value} cannot be packed"
+                    raise ValueError(msg)
+                board |= exponent << shift
+            shift += 4
+    if shift != 64:
+        msg = "Only 4x4 boards can be packed"
+        raise ValueError(msg)
+    return board
+
+# Returns the 4x4 list board for a packed board.
+def unpack(board: int) -> list[list[int]]:
+    result = []
+    for x in range(4):
+        row = (board >> (16 * x)) & ROW_MASK
+        result.append([1 << e if (e := (row >> (4 * y)) & 0xF) else 0 for y in range(4)])
+    return result
+
+# Swaps rows and columns of a packed board.
+def transpose(board: int) -> int:
+    a1 = board & 0xF0F0_0F0F_F0F0_0F0F
+    a2 = board & 0x0000_F0F0_0000_F0F0
+    a3 = board & 0x0F0F_0000_0F0F_0000
+    a = a1 | (a2 << 12) | (a3 >> 12)
+    b1 = a & 0xFF00_FF00_00FF_00FF
+    b2 = a & 0x00FF_00FF_0000_0000
+    b3 = a & 0x0000_0000_FF00_FF00
+    return b1 | (b2 >> 24) | (b3 << 24)
+
+# Applies a row table to each row of a packed board and returns the new board and score.
+def _move_rows(board: int, table: list[int], scores: list[int]) -> tuple[int, int]:
+    row0 = board & ROW_MASK
+    row1 = (board >> 16) & ROW_MASK
+    row2 = (board >> 32) & ROW_MASK
+    row3 = board >> 48
+    result = table[row0] | (table[row1] << 16) | (table[row2] << 32) | (table[row3] << 48)
+    return result, scores[row0] + scores[row1] + scores[row2] + scores[row3]
+
+# The moves use the row tables, which must have been built with build_tables() first.
+def move_left(board: int) -> tuple[int, int]:
+    return _move_rows(board, ROW_LEFT, ROW_SCORE)
+
+def move_right(board: int) -> tuple[int, int]:
+    return _move_rows(board, ROW_RIGHT, ROW_SCORE_RIGHT)
+
+def move_up(board: int) -> tuple[int, int]:
+    result, score = _move_rows(transpose(board), ROW_LEFT, ROW_SCORE)
+    return transpose(result), score
+
+def move_down(board: int) -> tuple[int, int]:
+    result, score = _move_rows(transpose(board), ROW_RIGHT, ROW_SCORE_RIGHT)
+    return transpose(result), score
+
+# Directions in the order used for encoding moves: the same names as logics.get_side returns.
+DIRECTIONS = ("UP", "DOWN", "LEFT", "RIGHT")
+
+MOVES = {
+    "LEFT": move_left,
+    "RIGHT": move_right,
+    "UP": move_up,
+    "DOWN": move_down,
+}
+
+# Returns the packed board after a move: (new board, score gained, moved).
+def move(board: int, direction: str) -> tuple[int, int, bool]:
+    new_board, score = MOVES[direction](board)
+    return new_board, score, new_board != board
+
+NIBBLE_LOW_BITS = 0x1111111111111111  # Lowest bit of every cell
+
+# Returns the lowest bit of every cell holding a 32768 tile
+def max_exponent_bits(board: int) -> int:
+    return board & board >> 1 & board >> 2 & board >> 3 & NIBBLE_LOW_BITS
+
+# Returns the lowest bit of every empty cell of a packed board, so bit 4 * (4 * x + y) is set if cell (x, y) is empty.
+def empty_bits(board: int) -> int:
+    occupied = board | board >> 1
+    occupied |= occupied >> 2
+    return ~occupied & NIBBLE_LOW_BITS
+
+# Packs the lowest bits of the 16 cells, as empty_bits returns them, into bits 0 to 15.
+def compress_nibbles(bits: int) -> int:
+    bits = (bits | bits >> 3) & 0x0303_0303_0303_0303
+    bits = (bits | bits >> 6) & 0x000F_000F_000F_000F
+    bits = (bits | bits >> 12) & 0x0000_00FF_0000_00FF
+    return (bits | bits >> 24) & 0xFFFF
+
+# Returns the largest exponent of a packed board, one bit at a time from the highest, keeping
+# only the cells that have every bit found so far.
+def max_exponent(board: int) -> int:
+    candidates = NIBBLE_LOW_BITS
+    exponent = 0
+    for bit in (3, 2, 1, 0):
+        higher = candidates & board >> bit
+        if higher:
+            candidates = higher
+            exponent |= 1 << bit
+    return exponent
+
+# Positions of the set bits of every byte, lowest first, for select_bit.
+BYTE_BITS = tuple(tuple(i for i in range(8) if byte >> i & 1) for byte in range(256))
+
+# Returns the position of the k-th lowest set bit of mask, counting from 0, a byte at a time.
+# Raises ValueError if mask has k bits or fewer.
+def select_bit(mask: int, k: int) -> int:
+    base = 0
+    while mask:
+        bits = BYTE_BITS[mask & 0xFF]
+        if k < len(bits):
+            return base + bits[k]
+        k -= len(bits)
+        mask >>= 8
+        base += 8
+    msg = "Not enough set bits in the mask"
+    raise ValueError(msg)
@@ -2,189 +2,344 @@ from __future__ import annotations
 # Importing necessary modules
 
 from collections.abc import Iterator
-from random import randint, random, shuffle
+from random import Random
 from typing import Any
 # Importing functions from a custom module
 
-from src.logics import get_index_from_number, get_number_from_index, quick_copy
+from src.bitboard import DIRECTIONS, MAX_EXPONENT, MOVES, build_tables, compress_nibbles, empty_bits, max_exponent, max_exponent_bits, merge_line, move, pack, select_bit, unpack
+from src.config import BLOCKS
+from src.grid import Grid
+
+# Moves a list board of any size and tile values, returns the new board and the score gained
+def _move_lists(mas: list[list[int]], direction: str) -> tuple[list[list[int]], int]:
+    height, width = len(mas), len(mas[0])
+    if direction in ("UP", "DOWN"):
+        lines = [[mas[x][y] for x in range(height)] for y in range(width)]
+    else:
+        lines = [list(row) for row in mas]
+    reverse = direction in ("RIGHT", "DOWN")
+    score = 0
+    for i, line in enumerate(lines):
+        merged, gained = merge_line(line[::-1] if reverse else line)
+        lines[i] = merged[::-1] if reverse else merged
+        score += gained
+    if direction in ("UP", "DOWN"):
+        lines = [[lines[y][x] for y in range(width)] for x in range(height)]
+    return lines, score
+
+# Returns the board after a move without changing anything: (new board, score gained, moved).
+# Needs no game object and no pygame, so it can be used by headless tools.
+def apply_move(mas: list[list[int]], direction: str) -> tuple[list[list[int]], int, bool]:
+    if direction not in MOVES:
+        msg = f"Unknown direction {direction!r}, must be one of {', '.join(MOVES)}"
+        raise ValueError(msg)
+    build_tables()
+    try:
+        board = pack(mas)
+    except ValueError:
+        # Boards other than 4x4 and tiles too large for the packed form are moved on the lists directly
+        new_mas, score = _move_lists(mas, direction)
+        return new_mas, score, new_mas != mas
+    new_board, score, moved = move(board, direction)
+    return unpack(new_board), score, moved
+
+# Returns one log2 exponent per cell, row by row, 0 for an empty one
+def to_exponents(mas: list[list[int]]) -> bytes:
+    return bytes(value.bit_length() - 1 if value else 0 for row in mas for value in row)
+
+# Returns the packed form of a board, or its exponents when it is not 4x4 or holds a tile too large to pack
+def to_state(mas: list[list[int]]) -> int | bytes:
+    try:
+        return pack(mas)
+    except ValueError:
+        return to_exponents(mas)
+
+# Returns the rows of width cells for exponents made by to_exponents
+def from_exponents(data: bytes, width: int) -> list[list[int]]:
+    values = [1 << exponent if exponent else 0 for exponent in data]
+    return [values[i:i + width] for i in range(0, len(values), width)]
 
 # Defining a class for the game board
 class GameBoard:
     # Class attribute to track if the board has moved
     is_board_move: bool = False
+    # Largest tile and legal moves, worked out when first asked for after the board changes, None until then
+    _max_tile: int | None = None
+    _legal_moves: tuple[str, ...] | None = None
+    # The cells moves and spawns work on: the packed form of a 4x4 board, or a Grid for other sizes
+    # and for tiles too large to pack. The rows are brought up to date when they are read.
+    _packed: int | None = None
+    _grid: Grid | None = None
+    _rows_stale: bool = False
+    # Set once get_mas, indexing or iteration has handed the rows out. Cells written through them are
+    # read back into the packed board or the Grid before either is used again.
+    _rows_shared: bool = False
 
-    # Initializing the game board
-    def __init__(self, mas: list | None = None) -> None:
+    # Initializing the game board. Tiles are spawned with rng, or with a new generator seeded
+    # with seed, so that a board created with the same seed always plays out the same way.
+    # A new board has size blocks per row and column.
+    def __init__(
+        self,
+        mas: list | None = None,
+        rng: Random | None = None,
+        seed: int | None = None,
+        size: int = BLOCKS,
+    ) -> None:
+        self.rng = rng if rng is not None else Random(seed)
+        # Building the move tables now, so the first move does not wait for them
+        build_tables()
 
         # If the board is provided, use it; otherwise, create an empty one
         if mas is not None:
-            self.__mas = mas
+            self.get_mas = mas
         else:
-            self.__mas = [
-                [0, 0, 0, 0],
-                [0, 0, 0, 0],
-                [0, 0, 0, 0],
-                [0, 0, 0, 0],
-            ]
+            self.get_mas = [[0] * size for _ in range(size)]
         # Inserting two random numbers (2 or 4) into two random empty cells
-
-        first_slot, second_slot = randint(1, 16), randint(1, 16)
-        while first_slot == second_slot:
-            first_slot, second_slot = randint(1, 16), randint(1, 16)
-
-        self.insert_2_or_4(*get_index_from_number(first_slot))
-        self.insert_2_or_4(*get_index_from_number(second_slot))
+        self.spawn()
+        self.spawn()
 
     # Overriding the __getitem__ method for convenient access to rows
     def __getitem__(self, item: int) -> list[int]:
-        result: list[int] = self.__mas[item]
+        result: list[int] = self.get_mas[item]
         return result
 
+    # Returns the tile at [x][y] without handing out the rows
+    def cell(self, x: int, y: int) -> int:
+        self._sync()
+        if self._grid is not None:
+            return self._grid[x, y]
+        exponent = self._packed >> (16 * x + 4 * y) & 0xF
+        return 1 << exponent if exponent else 0
+
+    # Returns a copy of the rows; unlike get_mas, writing to it does not change the board
+    def rows(self) -> list[list[int]]:
+        return [list(row) for row in self._rows()]
+
     # Overriding the __setitem__ method for updating rows
     def __setitem__(self, key: int, value: Any) -> None:
-        self.__mas[key] = value
+        mas = self._rows()
+        mas[key] = value
+        self._adopt(mas)
 
     # Implementing the Iterator protocol to iterate through rows
     def __iter__(self) -> Iterator:
-        return iter(self.__mas)
+        return iter(self.get_mas)
+
+    # Moves the board in the given direction; returns the score gained and sets is_board_move
+    def move(self, direction: str) -> int:
+        self._sync()
+        if self._grid is not None:
+            score, self.is_board_move = self._grid.move(direction)
+            if self.is_board_move:
+                self._rows_stale = True
+                self._max_tile = self._legal_moves = None
+            return score
+        if direction not in MOVES:
+            msg = f"Unknown direction {direction!r}, must be one of {', '.join(MOVES)}"
+            raise ValueError(msg)
+        new_board, score = MOVES[direction](self._packed)
+        self.is_board_move = new_board != self._packed
+        if self.is_board_move:
+            self._packed = new_board
+            self._rows_stale = True
+            self._max_tile = self._legal_moves = None
+            if score >= 1 << MAX_EXPONENT and max_exponent_bits(new_board):
+                # Two 32768 tiles could not merge on the packed board, so it moves to a Grid
+                self._adopt(self._rows())
+        return score
+
+    # Moves the board in the given direction and updates the game's score
+    def _move(self, direction: str, game: Any) -> None:
+        score = self.move(direction)
+        game.delta = score
+        game.old_score = game.score
+        game.score += score
 
     # Method to move the board to the left
     def move_left(self, game: Any) -> None:
-        # Creating a copy of the current board state
-
-        origin = quick_copy(self)
-        # Resetting the game's delta attribute
-
-        game.delta = 0
-        # Moving non-zero elements to the left and filling with zeros
-
-        for row in self:
-            while 0 in row:
-                row.remove(0)
-            while len(row) != 4:
-                row.append(0)
-        # Merging adjacent equal numbers and updating the score
-
-        for x in range(4):
-            for y in range(3):
-                if self[x][y] != 0 and self[x][y] == self[x][y + 1]:
-                    self[x][y] *= 2
-                    game.old_score = game.score
-                    game.score += self[x][y]
-                    game.delta += self[x][y]
-                    self[x].pop(y + 1)
-                    self[x].append(0)
-        # Checking if the board has moved
-        self.is_board_move = origin != self.get_mas
+        self._move("LEFT", game)
 
     #Similar to previous method
     def move_right(self, game: Any) -> None:
-        origin = quick_copy(self)
-        game.delta = 0
-        for row in self:
-            while 0 in row:
-                row.remove(0)
-            while len(row) != 4:
-                row.insert(0, 0)
-
-        for x in range(4):
-            for y in range(3, 0, -1):
-                if self[x][y] != 0 and self[x][y] == self[x][y - 1]:
-                    self[x][y] *= 2
-                    game.old_score = game.score
-                    game.score += self[x][y]
-                    game.delta += self[x][y]
-                    self[x].pop(y - 1)
-                    self[x].insert(0, 0)
-        self.is_board_move = origin != self.get_mas
+        self._move("RIGHT", game)
 
     #Similar to previous method
     def move_up(self, game: Any) -> None:
-        origin = quick_copy(self)
-        game.delta = 0
-        for y in range(4):
-            column = [self[x][y] for x in range(4) if self[x][y] != 0]
-            while len(column) != 4:
-                column.append(0)
-            for x in range(3):
-                if column[x] != 0 and column[x] == column[x + 1]:
-                    column[x] *= 2
-                    game.old_score = game.score
-                    game.score += column[x]
-                    game.delta += column[x]
-                    column.pop(x + 1)
-                    column.append(0)
-            for x in range(4):
-                self[x][y] = column[x]
-        self.is_board_move = origin != self.get_mas
+        self._move("UP", game)
 
     #Similar to the previous method
     def move_down(self, game: Any) -> None:
-        origin = quick_copy(self)
-        game.delta = 0
-        for y in range(4):
-            column = [self[x][y] for x in range(4) if self[x][y] != 0]
-            while len(column) != 4:
-                column.insert(0, 0)
-            for x in range(3, 0, -1):
-                if column[x] != 0 and column[x] == column[x - 1]:
-                    column[x] *= 2
-                    game.old_score = game.score
-                    game.score += column[x]
-                    game.delta += column[x]
-                    column.pop(x - 1)
-                    column.insert(0, 0)
-            for x in range(4):
-                self[x][y] = column[x]
-        self.is_board_move = origin != self.get_mas
+        self._move("DOWN", game)
 
     # Property to get the current state of the board
     @property
     def get_mas(self) -> list[list[int]]:
         """Get board as list."""
-        return self.__mas
+        rows = self._rows()
+        self._rows_shared = True
+        return rows
 
     # Setter for updating the board state
     @get_mas.setter
     def get_mas(self, value: Any) -> None:
+        self._adopt(value)
+
+    # Returns the rows, brought up to date with the packed board or the Grid
+    def _rows(self) -> list[list[int]]:
+        if self._rows_stale:
+            # Updating the rows in place so that references to them stay valid
+            new_rows = unpack(self._packed) if self._grid is None else self._grid.rows()
+            for row, new_row in zip(self.__mas, new_rows):
+                row[:] = new_row
+            self._rows_stale = False
+        return self.__mas
+
+    # Reads the cells back from the rows if they have been handed out since they were last read
+    def _sync(self) -> None:
+        if self._rows_shared:
+            self._adopt(self.__mas)
+
+    # Makes the given rows the board and rebuilds the packed board or the Grid from them
+    def _adopt(self, value: Any) -> None:
         self.__mas = value
+        self._rows_shared = False
+        try:
+            self._packed = pack(value)
+            self._grid = None
+        except ValueError:
+            # Boards other than 4x4 and tiles too large for the packed form are kept in a Grid
+            self._packed = None
+            self._grid = Grid.from_rows(value, self.rng)
+        self._rows_stale = False
+        self._max_tile = self._legal_moves = None
+
+    # The packed form of the board, or None if it cannot be packed
+    @property
+    def packed(self) -> int | None:
+        self._sync()
+        return self._packed
+
+    # Sets the cells from log2 exponents, one byte per cell row by row as to_exponents returns them,
+    # read from data at start, so that a board kept in a larger buffer is loaded without copying it
+    def load_exponents(self, data: bytes | bytearray, start: int = 0) -> None:
+        self._sync()
+        if self._grid is not None:
+            grid = self._grid
+            for index in range(len(grid.cells)):
+                exponent = data[start + index]
+                grid[divmod(index, grid.width)] = 1 << exponent if exponent else 0
+        else:
+            board = 0
+            for cell in range(16):
+                exponent = data[start + cell]
+                if exponent >= MAX_EXPONENT:
+                    # A tile too large to pack moves the board to a Grid
+                    mas = self._rows()
+                    for index in range(16):
+                        exponent = data[start + index]
+                        mas[index // 4][index % 4] = 1 << exponent if exponent else 0
+                    self._adopt(mas)
+                    return
+                board |= exponent << 4 * cell
+            self._packed = board
+        self._rows_stale = True
+        self._max_tile = self._legal_moves = None
+
+    # Shows a packed 4x4 board, as the undo history keeps it
+    def load_packed(self, board: int) -> None:
+        self._packed = board
+        self._grid = None
+        self._rows_shared = False
+        self._rows_stale = True
+        self._max_tile = self._legal_moves = None
+
+    # Bitmask of the empty cells, bit x * width + y for the cell [x][y]
+    @property
+    def empty_mask(self) -> int:
+        self._sync()
+        if self._grid is not None:
+            return sum(1 << cell for cell, value in enumerate(self._grid.cells) if value == 0)
+        return compress_nibbles(empty_bits(self._packed))
+
+    @property
+    def max_tile(self) -> int:
+        self._sync()
+        if self._max_tile is None:
+            if self._grid is not None:
+                self._max_tile = self._grid.max_tile()
+            else:
+                exponent = max_exponent(self._packed)
+                self._max_tile = 1 << exponent if exponent else 0
+        return self._max_tile
+
+    # Directions in which a move would change the board, in the order of DIRECTIONS
+    @property
+    def legal_moves(self) -> tuple[str, ...]:
+        self._sync()
+        if self._legal_moves is None:
+            if self._grid is not None:
+                self._legal_moves = self._grid.legal_moves()
+            else:
+                board = self._packed
+                self._legal_moves = tuple(direction for direction in DIRECTIONS if MOVES[direction](board)[0] != board)
+        return self._legal_moves
 
     # Method to check if there are empty cells on the board
     def are_there_zeros(self) -> bool:
-        return any(0 in row for row in self)
+        self._sync()
+        if self._grid is not None:
+            return self._grid.empty_count() != 0
+        return empty_bits(self._packed) != 0
 
     # Method to get a list of numbers corresponding to empty cells
     def get_empty_list(self) -> list:
-        return [get_number_from_index(i, y) for i in range(4) for y in range(4) if self[i][y] == 0]
+        mask = self.empty_mask
+        return [cell + 1 for cell in range(mask.bit_length()) if mask >> cell & 1]
 
     # Method to insert a random 2 or 4 into an empty cell
     def insert_in_mas(self) -> None:
         # Checking if the board has moved and there are empty cells
         if self.is_board_move and self.are_there_zeros():
             self.is_board_move = False
-            # Getting a list of empty cells, shuffling it, and selecting a random one
-            empty = self.get_empty_list()
-            shuffle(empty)
-            random_num = empty.pop()
-            x, y = get_index_from_number(random_num)
-            # Inserting 2 or 4 into the selected cell
-            self.insert_2_or_4(x, y)
+            self.spawn()
+
+    # Inserts 2 or 4 into an empty cell picked uniformly at random, from the empty bits of the packed
+    # board or the Grid's list of empty cells, without looking at the rows. Does nothing if the board is full.
+    def spawn(self) -> None:
+        self._sync()
+        if self._grid is not None:
+            if self._grid.spawn():
+                self._rows_stale = True
+                self._max_tile = self._legal_moves = None
+            return
+        empty = empty_bits(self._packed)
+        if empty:
+            shift = select_bit(empty, self.rng.randrange(empty.bit_count()))
+            self.insert_2_or_4(*divmod(shift // 4, 4))
 
     # Method to insert a random 2 or 4 into a specified cell
     def insert_2_or_4(self, x: int, y: int) -> None:
         # Randomly choosing whether to insert 2 or 4
-        if random() <= 0.90:
-            self[x][y] = 2
+        if self.rng.random() <= 0.90:
+            value = 2
+        else:
+            value = 4
+        self._sync()
+        if self._grid is not None:
+            self._grid[x, y] = value
         else:
-            self[x][y] = 4
-    # Method to check if any valid moves can be made on the board
+            shift = 16 * x + 4 * y
+            self._packed = self._packed & ~(0xF << shift) | value.bit_length() - 1 << shift
+        if not self._rows_stale:
+            self.__mas[x][y] = value
+        self._max_tile = self._legal_moves = None
+
+    # Method to check if any move would change the board
     def can_move(self) -> bool:
-        for i in range(3):
-            for y in range(3):
-                if self[i][y] in (self[i][y + 1], self[i + 1][y]):
-                    return True
-        for i in range(3, 0, -1):
-            for y in range(3, 0, -1):
-                if self[i][y] in (self[i][y - 1], self[i - 1][y]):
-                    return True
-        return False
\ No newline at end of file
+        self._sync()
+        if self._grid is not None:
+            return self._grid.can_move()
+        # A tile next to an empty cell can always slide into it
+        if self._packed and empty_bits(self._packed):
+            return True
+        return bool(self.legal_moves)
@@ -1,3 +1,4 @@
+import os
 import sys
 from pathlib import Path
 from typing import NamedTuple
@@ -9,6 +10,16 @@ def resource_path(relative_path: Path) -> Path:
     # Join the base path with the relative path of the resource.
     return base_path.joinpath(relative_path)
 
+# Returns the per-user folder for saved games, following the conventions of each system.
+def user_data_dir(app_name: str) -> Path:
+    if sys.platform == "win32":
+        base = Path(os.environ.get("APPDATA", Path.home() / "AppData" / "Roaming"))
+    elif sys.platform == "darwin":
+        base = Path.home() / "Library" / "Application Support"
+    else:
+        base = Path(os.environ.get("XDG_DATA_HOME", Path.home() / ".local" / "share"))
+    return base / app_name
+
 # NamedTuple for storing size with width and height as integers.
 Size = NamedTuple("Size", (("width", int), ("height", int)))
 
@@ -25,6 +36,19 @@ FRAMERATE = 120  # Maximum frames per second.
 BLOCKS = 4  # Number of blocks per row/column.
 SIZE_BLOCK = 112  # Pixel size of each block.
 MARGIN = 9  # Margin size between blocks.
+LAYOUT_BLOCKS = 4  # Board size the background image and the two sizes above are made for.
+
+AI_DEPTH = 2  # Moves the autoplay AI looks ahead, 2 keeps each decision within a frame.
+AI_MAX_DEPTH = 6  # Deepest search of the timed autoplay, which deepens until its time is up.
+AI_MOVE_TIME_LIMIT = 1.0  # Most seconds the timed autoplay thinks about one move.
+HINT_DEPTH = 3  # Moves the hint search looks ahead, it runs beside the game loop so it can go deeper.
+UNDO_DEPTH = 64  # Moves that can be undone in a row.
+
+DATA_DIR = user_data_dir("TTFE")  # Per-user folder for the saved game.
+SAVE_PATH = DATA_DIR / "save.ttfe"  # Snapshot of the game in progress.
+REPLAYS_DIR = DATA_DIR / "replays"  # Seed and moves of every finished game.
+AUTOSAVE_INTERVAL = 5.0  # Seconds between background saves of the game in progress.
+PROFILE_PATH = DATA_DIR / "frame_times.csv"  # Histogram of frame times, written at exit.
 
 USERNAME = None  # Variable for storing username, starts as None.
 MIN_NAME_LENGTH = 3  # Minimum length for a valid username.
@@ -61,5 +85,8 @@ COLORS = {
     2048: "#cb5151",
     "WHITE": "#ebeeff",  # Color for text.
     "GRAY": "#aebad0",  # Color for text.
-    "BLACK": "#000000"
+    "BLACK": "#000000",
+    "BOARD": "#4c0000",  # Color of the board behind the cells.
+    "CELL": "#380001",  # Color of an empty cell.
+    "HINT": (235, 238, 255, 110),  # Color of the hint arrow, see-through.
 }
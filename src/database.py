@@ -1,9 +1,142 @@
 # Import library to connect game with database and save results
 from __future__ import annotations
 
+import atexit
+import csv
+import queue
 import sqlite3
+import sys
+import threading
+from collections.abc import Iterator
 from sqlite3 import Cursor
-__all__ = ["get_best", "insert_result", "cursor"]
+from typing import TextIO
+__all__ = [
+    "get_best",
+    "get_leaderboard",
+    "get_rank",
+    "get_player_stats",
+    "iter_leaderboard",
+    "export_leaderboard",
+    "insert_result",
+    "invalidate_leaderboard",
+    "flush",
+    "close",
+    "cursor",
+]
+
+DB_PATH = "2048.sqlite"
+
+LEADERBOARD_SIZE = 3  # Number of players shown in the rating
+# Top players as (name, best score), best first; None until first read from the database
+_leaderboard: list[tuple[str, int]] | None = None
+# Results waiting for the writer thread, None asks it to stop
+_pending: queue.Queue[tuple[str | None, int] | None] = queue.Queue()
+_writer: threading.Thread | None = None
+# Connection of the game's thread, opened by get_cursor on first use
+_connection: sqlite3.Connection | None = None
+_cursor: Cursor | None = None
+
+# Returns the cursor of the game's connection, opening the database and creating the tables on first use.
+def get_cursor() -> Cursor:
+    global _connection, _cursor
+    if _cursor is None:
+        _connection = sqlite3.connect(DB_PATH)
+        _cursor = _connection.cursor()
+        _create_schema(_cursor)
+        _connection.commit()
+    return _cursor
+
+# The module attribute cursor of earlier versions, now opened on first access.
+def __getattr__(name: str) -> Cursor:
+    if name == "cursor":
+        return get_cursor()
+    msg = f"module {__name__!r} has no attribute {name!r}"
+    raise AttributeError(msg)
+
+# Returns the top players, reading them from the BEST table only when the cache is empty.
+def _get_leaderboard() -> list[tuple[str, int]]:
+    global _leaderboard
+    if _leaderboard is None:
+        _leaderboard = get_leaderboard(LEADERBOARD_SIZE)
+    return _leaderboard
+
+# Returns up to limit rows of (name, best, games, total) in rating order, starting after
+# the given (best, name); unlike an offset this seeks straight to the start in the index.
+def _select_page(limit: int, after: tuple[int, str] | None) -> list[tuple[str, int, int, int]]:
+    cursor = get_cursor()
+    if after is None:
+        cursor.execute(
+            """
+            SELECT name, score, games, total FROM BEST
+            ORDER by score DESC, name
+            LIMIT ?
+        """,
+            (limit,),
+        )
+    else:
+        score, name = after
+        cursor.execute(
+            """
+            SELECT name, score, games, total FROM BEST
+            WHERE score < ? OR (score = ? AND name > ?)
+            ORDER by score DESC, name
+            LIMIT ?
+        """,
+            (score, score, name, limit),
+        )
+    return cursor.fetchall()
+
+# Returns a page of players as (name, best score), best first.
+# To get the next page pass the score and name of the last player as after.
+def get_leaderboard(limit: int = 10, after: tuple[int, str] | None = None) -> list[tuple[str, int]]:
+    flush()
+    return [(name, score) for name, score, _, _ in _select_page(limit, after)]
+
+# Returns the place of a player in the rating (players with equal best scores share it),
+# or None for a player without results.
+def get_rank(name: str) -> int | None:
+    flush()
+    cursor = get_cursor()
+    row = cursor.execute("SELECT score FROM BEST WHERE name = ?", (name,)).fetchone()
+    if row is None:
+        return None
+    better = cursor.execute("SELECT count(*) FROM BEST WHERE score > ?", row).fetchone()[0]
+    return better + 1
+
+# Returns games played, best and average score and rank of a player, or None for a player without results.
+def get_player_stats(name: str) -> dict | None:
+    flush()
+    row = get_cursor().execute("SELECT games, score, total FROM BEST WHERE name = ?", (name,)).fetchone()
+    if row is None:
+        return None
+    games, best, total = row
+    return {"name": name, "games": games, "best": best, "average": total / games if games else 0.0, "rank": get_rank(name)}
+
+# Yields (rank, name, best, games, average) for every player, best first, reading page by page.
+def iter_leaderboard(page_size: int = 1000) -> Iterator[tuple[int, str, int, int, float]]:
+    flush()
+    after: tuple[int, str] | None = None
+    position = 0
+    rank = 0
+    previous = None
+    while True:
+        rows = _select_page(page_size, after)
+        for name, best, games, total in rows:
+            position += 1
+            if best != previous:
+                rank, previous = position, best
+            yield rank, name, best, games, total / games if games else 0.0
+        if len(rows) < page_size:
+            return
+        after = (rows[-1][1], rows[-1][0])
+
+# Writes the whole rating to a CSV file.
+def export_leaderboard(file: TextIO) -> None:
+    writer = csv.writer(file)
+    writer.writerow(("rank", "name", "best", "games", "average"))
+    for rank, name, best, games, average in iter_leaderboard():
+        writer.writerow((rank, name, best, games, f"{average:.1f}"))
+
 # Method returns the result of the top 3 players.
 def get_best(count: int = 0) -> dict:
     try:
@@ -11,38 +144,130 @@ def get_best(count: int = 0) -> dict:
     except AssertionError as exc:
         msg = "Invalid argument count, must be no more than 3 and no less than -1"
         raise ValueError(msg) from exc
-# creating a table
-    cursor.execute(
-        """
-        SELECT name gamer, max(score) score FROM RECORDS
-        GROUP by name
-        ORDER by score DESC
-        LIMIT 3
-    """,
-    )
-# for request and receipt
-    source = cursor.fetchall()
+# served from the cache, the database is only read after an invalidation
+    source = _get_leaderboard()
 # to write it in format dictionary
     sparse_arr = [source[i] for i in range(len(source)) if len(source) >= 1] + [(None, -1)] * (3 - len(source))
     result: dict[int, dict] = {i: {"name": sparse_arr[i - 1][0], "score": sparse_arr[i - 1][1]} for i in range(1, 4)}
     return result if count == 0 else result[count]
 
-# Inserts new data into the SQL table, saving it.
+# Drops the cached top players, the next get_best reads them again.
+def invalidate_leaderboard() -> None:
+    global _leaderboard
+    _leaderboard = None
+
+# Puts a new result into the cached top players without querying the database.
+def _update_leaderboard(name: str, score: int) -> None:
+    global _leaderboard
+    if _leaderboard is None:
+        return
+    best = dict(_leaderboard)
+    if score > best.get(name, -1):
+        best[name] = score
+        _leaderboard = sorted(best.items(), key=lambda item: (-item[1], item[0]))[:LEADERBOARD_SIZE]
+
+# Writes a batch of results in one transaction, keeping every player's best score up to date.
+def _write(connection: sqlite3.Connection, results: list[tuple[str | None, int]]) -> None:
+    with connection:
+        connection.executemany(
+            """
+            insert into RECORDS values ( ?, ?)
+        """,
+            results,
+        )
+        connection.executemany(
+            """
+            insert into BEST values ( ?, ?, 1, ?)
+            on conflict (name) do update set
+                score = max(score, excluded.score),
+                games = games + 1,
+                total = total + excluded.total
+        """,
+            [(name, score, score) for name, score in results if name is not None],
+        )
+
+# Body of the writer thread: waits for results and saves everything queued so far together.
+def _run_writer() -> None:
+    connection = sqlite3.connect(DB_PATH)
+    connection.execute("pragma journal_mode=wal")
+    running = True
+    while running:
+        batch = [_pending.get()]
+        while True:
+            try:
+                batch.append(_pending.get_nowait())
+            except queue.Empty:
+                break
+        results = [result for result in batch if result is not None]
+        running = len(results) == len(batch)
+        try:
+            if results:
+                _write(connection, results)
+        except sqlite3.Error as exc:
+            print(f"Could not save {len(results)} results: {exc}", file=sys.stderr)
+        finally:
+            for _ in batch:
+                _pending.task_done()
+    connection.close()
+
+# Queues new data for the SQL table; it is saved by the writer thread so the game never waits for the disk.
 def insert_result(name: str | None, score: int) -> None:
+    global _writer
+    if _writer is None or not _writer.is_alive():
+        get_cursor()  # The tables must exist before the writer thread uses them
+        _writer = threading.Thread(target=_run_writer, name="database-writer", daemon=True)
+        _writer.start()
+    if name is not None:
+        _update_leaderboard(name, score)
+    _pending.put((name, score))
+
+# Waits until every queued result is saved.
+def flush() -> None:
+    if _writer is not None and _writer.is_alive():
+        _pending.join()
+
+# Saves the queued results, stops the writer thread and closes the connection; called on exit.
+def close() -> None:
+    global _writer, _connection, _cursor
+    if _writer is not None and _writer.is_alive():
+        _pending.put(None)
+        _writer.join()
+    _writer = None
+    if _connection is not None:
+        _connection.close()
+        _connection = _cursor = None
+
+# Creates the tables, and fills BEST from the records of databases from before it existed.
+def _create_schema(cursor: Cursor) -> None:
+    # Readers and the writer thread do not block each other in WAL mode
+    cursor.execute("pragma journal_mode=wal")
     cursor.execute(
         """
-        insert into RECORDS values ( ?, ?)
-    """,
-        (name, score),
+    create table if not exists RECORDS (
+        name text,
+        score integer
+    )""",
     )
-# Saving results
-    BD.commit()
-BD = sqlite3.connect("2048.sqlite")
-cursor: Cursor = BD.cursor()
-cursor.execute(
-    """
-create table if not exists RECORDS (
-    name text,
-    score integer
-)""",
-)
\ No newline at end of file
+    # Best score, games played and total score of every player, so the rating never aggregates all of RECORDS
+    cursor.execute(
+        """
+    create table if not exists BEST (
+        name text primary key,
+        score integer not null,
+        games integer not null default 0,
+        total integer not null default 0
+    )""",
+    )
+    cursor.execute("create index if not exists BEST_BY_SCORE on BEST (score desc, name)")
+    # Databases from before BEST existed get it filled once from their records
+    if cursor.execute("select 1 from BEST limit 1").fetchone() is None:
+        cursor.execute(
+            """
+        insert into BEST
+        select name, max(score), count(*), sum(score) from RECORDS
+        where name is not null
+        group by name
+    """,
+        )
+
+atexit.register(close)
@@ -20,8 +20,11 @@ class Game:
     old_score: int
     # Initializing the game object
     def __init__(self, size: Size, framerate: int = 60) -> None:
-        # Setting up the game window
-        self.screen = pg.display.set_mode((size.width, size.height))
+        # Setting up the game window, the one already open is kept when the game is reset
+        screen = pg.display.get_surface()
+        if screen is None or screen.get_size() != (size.width, size.height):
+            screen = pg.display.set_mode((size.width, size.height))
+        self.screen = screen
         self.clock = pg.time.Clock()
         self.framerate = framerate
         self.width = size.width
@@ -0,0 +1,140 @@
+from __future__ import annotations
+# Board engine for any width and height, behind GameBoard for the boards the packed 4x4 form
+# cannot hold: other sizes and tiles above 16384. Cells are kept in one flat list, row by row, and the empty ones
+# in a list with the position of every cell in it, so a spawn never scans the board.
+
+from random import Random
+
+from src.bitboard import DIRECTIONS, merge_line
+
+class Grid:
+    def __init__(self, width: int, height: int, rng: Random | None = None, seed: int | None = None) -> None:
+        if width < 2 or height < 2:
+            msg = f"Invalid grid size {width}x{height}, must be at least 2x2"
+            raise ValueError(msg)
+        self.width = width
+        self.height = height
+        self.rng = rng if rng is not None else Random(seed)
+        self.cells = [0] * (width * height)
+        self._empty = list(range(width * height))  # Indices of the empty cells, in no order
+        self._slot = list(range(width * height))  # Position of each cell in _empty, -1 if taken
+        self.score = 0
+        # Cell indices of every line in the order tiles slide along it, per direction
+        rows = [[x * width + y for y in range(width)] for x in range(height)]
+        columns = [[x * width + y for x in range(height)] for y in range(width)]
+        self._lines = {
+            "LEFT": rows,
+            "RIGHT": [row[::-1] for row in rows],
+            "UP": columns,
+            "DOWN": [column[::-1] for column in columns],
+        }
+
+    # Returns a grid holding the given rows, which may be any rectangle
+    @classmethod
+    def from_rows(cls, mas: list[list[int]], rng: Random | None = None, seed: int | None = None) -> Grid:
+        grid = cls(len(mas[0]), len(mas), rng, seed)
+        for x, row in enumerate(mas):
+            for y, value in enumerate(row):
+                grid[x, y] = value
+        return grid
+
+    def __getitem__(self, cell: tuple[int, int]) -> int:
+        x, y = cell
+        return self.cells[x * self.width + y]
+
+    def __setitem__(self, cell: tuple[int, int], value: int) -> None:
+        x, y = cell
+        self._set(x * self.width + y, value)
+
+    # Returns the board as a list of rows, like GameBoard.get_mas
+    def rows(self) -> list[list[int]]:
+        return [self.cells[i:i + self.width] for i in range(0, len(self.cells), self.width)]
+
+    def empty_count(self) -> int:
+        return len(self._empty)
+
+    def max_tile(self) -> int:
+        return max(self.cells)
+
+    # Moves the board; returns the score gained and whether any tile moved
+    def move(self, direction: str) -> tuple[int, bool]:
+        lines = self._lines.get(direction)
+        if lines is None:
+            msg = f"Unknown direction {direction!r}, must be one of {', '.join(self._lines)}"
+            raise ValueError(msg)
+        cells = self.cells
+        score = 0
+        moved = False
+        for line in lines:
+            values = [cells[i] for i in line]
+            merged, gained = merge_line(values)
+            if merged != values:
+                moved = True
+                score += gained
+                for i, old, new in zip(line, values, merged):
+                    if old != new:
+                        self._set(i, new)
+        self.score += score
+        return score, moved
+
+    # Puts a 2 (or a 4 one time in ten) into a random empty cell; returns False if there is none
+    def spawn(self) -> bool:
+        if not self._empty:
+            return False
+        index = self._empty[self.rng.randrange(len(self._empty))]
+        self._set(index, 2 if self.rng.random() <= 0.90 else 4)
+        return True
+
+    # Checks if any move would change the board
+    def can_move(self) -> bool:
+        if self._empty:
+            return True
+        cells = self.cells
+        width = self.width
+        for i, value in enumerate(cells):
+            if (i % width != width - 1 and cells[i + 1] == value) or (i + width < len(cells) and cells[i + width] == value):
+                return True
+        return False
+
+    # Returns the directions in which a move would change the board, in the order of bitboard.DIRECTIONS.
+    # A move is possible towards a cell if a tile can slide into it or merge with it.
+    def legal_moves(self) -> tuple[str, ...]:
+        cells = self.cells
+        width = self.width
+        left = right = up = down = False
+        for start in range(0, len(cells), width):
+            for i in range(start, start + width - 1):
+                first, second = cells[i], cells[i + 1]
+                if first == second:
+                    if first:
+                        left = right = True
+                elif first == 0:
+                    left = True
+                elif second == 0:
+                    right = True
+        for i in range(len(cells) - width):
+            first, second = cells[i], cells[i + width]
+            if first == second:
+                if first:
+                    up = down = True
+            elif first == 0:
+                up = True
+            elif second == 0:
+                down = True
+        return tuple(direction for direction, possible in zip(DIRECTIONS, (up, down, left, right)) if possible)
+
+    # Changes one cell, keeping the list of empty cells up to date in constant time
+    def _set(self, index: int, value: int) -> None:
+        was_empty = self.cells[index] == 0
+        self.cells[index] = value
+        if was_empty and value != 0:
+            # Swap the last empty cell into the freed position
+            position = self._slot[index]
+            last = self._empty.pop()
+            if last != index:
+                self._empty[position] = last
+                self._slot[last] = position
+            self._slot[index] = -1
+        elif not was_empty and value == 0:
+            self._slot[index] = len(self._empty)
+            self._empty.append(index)
@@ -0,0 +1,93 @@
+from __future__ import annotations
+# Move hints, and the moves of the timed autoplay, searched in a background process, so the
+# search never holds the game loop's GIL.
+# Every request gets a new generation number in shared memory; the search stops as soon as
+# a newer request or a cancel changes it, and a result is only handed out while it still
+# belongs to the current generation. The game loop reads the result without taking a lock.
+
+import multiprocessing
+import signal
+import threading
+from collections.abc import Callable
+from ctypes import c_longlong
+from multiprocessing.connection import Connection
+
+from src.ai import Expectimax, SearchAborted
+
+# The game already runs threads (audio, autosave) when the search starts, and forking a process
+# with threads can copy a lock in the middle of being held, so the process starts fresh instead
+_CONTEXT = multiprocessing.get_context("spawn")
+
+# Body of the search process: searches the newest request, drops the ones before it.
+# A request with seconds deepens the search until that time is up instead of using the fixed depth.
+def _search(depth: int, generation: c_longlong, requests: Connection, results: Connection) -> None:
+    # Ctrl+C is left to the game, which stops this process when it exits
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    search = Expectimax(depth=depth)
+    current = 0
+    search.abort = lambda: generation.value != current
+    while True:
+        try:
+            current, board, seconds, max_depth = requests.recv()
+            while requests.poll():
+                current, board, seconds, max_depth = requests.recv()
+        except EOFError:
+            return
+        try:
+            if seconds is None:
+                direction = search.best_move(board)
+            else:
+                direction = search.best_move_timed(board, seconds, max_depth)
+        except SearchAborted:
+            continue
+        results.send((current, direction))
+
+class HintService:
+    # on_ready is called from a helper thread when a hint is found, to wake the game loop
+    def __init__(self, depth: int, on_ready: Callable[[], None] | None = None) -> None:
+        self.depth = depth
+        self.on_ready = on_ready
+        self._generation: c_longlong = _CONTEXT.RawValue("q", 0)  # Changed only by the game loop
+        self._result: tuple[int, str | None] = (0, None)  # Generation and the move found for it
+        self._requests: Connection | None = None
+        self._process: multiprocessing.process.BaseProcess | None = None
+
+    # Starts searching the best move for a packed board, dropping any search still running.
+    # With seconds the search deepens up to max_depth until the time is up, see Expectimax.best_move_timed.
+    def request(self, board: int, seconds: float | None = None, max_depth: int = 8) -> None:
+        if self._process is None:
+            self._start()
+        self._generation.value += 1
+        self._requests.send((self._generation.value, board, seconds, max_depth))
+
+    # Stops the running search and forgets the current hint
+    def cancel(self) -> None:
+        self._generation.value += 1
+
+    # Returns the hint for the board requested last, or None while it is being searched
+    def poll(self) -> str | None:
+        generation, direction = self._result
+        return direction if generation == self._generation.value else None
+
+    # Starts the search process, which builds its tables itself, and the thread reading its results
+    def _start(self) -> None:
+        request_reader, self._requests = _CONTEXT.Pipe(duplex=False)
+        result_reader, result_writer = _CONTEXT.Pipe(duplex=False)
+        self._process = _CONTEXT.Process(
+            target=_search,
+            args=(self.depth, self._generation, request_reader, result_writer),
+            name="hints",
+            daemon=True,
+        )
+        self._process.start()
+        threading.Thread(target=self._listen, args=(result_reader,), name="hints", daemon=True).start()
+
+    # Body of the thread reading results; it sleeps in recv, so it does not compete with the loop
+    def _listen(self, results: Connection) -> None:
+        while True:
+            try:
+                self._result = results.recv()
+            except EOFError:
+                return
+            if self.on_ready is not None:
+                self.on_ready()
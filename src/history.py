@@ -0,0 +1,117 @@
+from __future__ import annotations
+# Undo and redo history kept in a preallocated ring buffer of boards and scores.
+# A 4x4 board is stored in its packed form, see bitboard.pack. Boards that cannot be packed
+# are stored as one log2 exponent byte per cell, see board.to_exponents.
+
+from array import array
+
+class History:
+    # depth is the number of moves that can be undone, cells the number of cells of a board
+    def __init__(self, depth: int, cells: int = 16) -> None:
+        if depth < 1:
+            msg = "Invalid argument depth, must be at least 1"
+            raise ValueError(msg)
+        self.capacity = depth + 1  # The current state plus one per move that can be undone
+        self.cells = cells
+        self._packed = array("Q", bytes(8 * self.capacity))
+        self._scores = array("q", bytes(8 * self.capacity))
+        # Exponent bytes of the boards that are not packed, allocated when the first one is stored
+        self._boards: bytearray | None = None
+        self._is_packed = bytearray(self.capacity)  # 1 for the slots holding a packed board
+        # Positions count every state ever stored; a state's slot is its position modulo capacity
+        self._first = 0  # Oldest state still kept
+        self._current = 0  # State shown now
+        self._end = 1  # One past the newest state that can be redone
+
+    # Board of the current state: its packed form, or its exponent bytes
+    @property
+    def board(self) -> int | bytes:
+        return self._board(self._current)
+
+    # Packed board of the current state, or None if it is stored as exponent bytes
+    @property
+    def packed(self) -> int | None:
+        slot = self._current % self.capacity
+        return self._packed[slot] if self._is_packed[slot] else None
+
+    # Buffer holding the exponent boards and the offset of the current one in it, to read a board
+    # that is not packed without copying it
+    def board_slice(self) -> tuple[bytearray, int]:
+        if self._boards is None or self.packed is not None:
+            msg = "The current board is packed, read it with packed"
+            raise ValueError(msg)
+        return self._boards, self._current % self.capacity * self.cells
+
+    # Score of the current state
+    @property
+    def score(self) -> int:
+        return self._scores[self._current % self.capacity]
+
+    # Forgets everything and starts again from the given state
+    def reset(self, board: int | bytes, score: int) -> None:
+        self._first = self._current = 0
+        self._end = 1
+        self._store(0, board, score)
+
+    # Stores the state after a move; the states that could be redone are dropped
+    def push(self, board: int | bytes, score: int) -> None:
+        self._current += 1
+        self._end = self._current + 1
+        self._first = max(self._first, self._end - self.capacity)
+        self._store(self._current, board, score)
+
+    def can_undo(self) -> bool:
+        return self._current > self._first
+
+    def can_redo(self) -> bool:
+        return self._current + 1 < self._end
+
+    # Steps back to the previous state; returns False if there is none
+    def undo(self) -> bool:
+        if not self.can_undo():
+            return False
+        self._current -= 1
+        return True
+
+    # Steps forward to the state that was undone last; returns False if there is none
+    def redo(self) -> bool:
+        if not self.can_redo():
+            return False
+        self._current += 1
+        return True
+
+    # Returns the previous state as (board, score) without stepping back, or None
+    def previous(self) -> tuple[int | bytes, int] | None:
+        if not self.can_undo():
+            return None
+        return self._board(self._current - 1), self._scores[(self._current - 1) % self.capacity]
+
+    # Returns the score of the previous state without stepping back, or None
+    def previous_score(self) -> int | None:
+        if not self.can_undo():
+            return None
+        return self._scores[(self._current - 1) % self.capacity]
+
+    def _board(self, position: int) -> int | bytes:
+        slot = position % self.capacity
+        if self._is_packed[slot]:
+            return self._packed[slot]
+        return bytes(self._boards[slot * self.cells:(slot + 1) * self.cells])
+
+    def _store(self, position: int, board: int | bytes, score: int) -> None:
+        slot = position % self.capacity
+        if isinstance(board, int):
+            if self.cells != 16:
+                msg = f"Invalid packed board, only boards of 16 cells are packed, not {self.cells}"
+                raise ValueError(msg)
+            self._packed[slot] = board
+            self._is_packed[slot] = 1
+        else:
+            if len(board) != self.cells:
+                msg = f"Invalid board of {len(board)} cells, must have {self.cells}"
+                raise ValueError(msg)
+            if self._boards is None:
+                self._boards = bytearray(self.capacity * self.cells)
+            self._boards[slot * self.cells:(slot + 1) * self.cells] = board
+            self._is_packed[slot] = 0
+        self._scores[slot] = score
@@ -1,48 +1,99 @@
 import sys
+import time
 from abc import abstractmethod
 from pathlib import Path
 
 import pygame as pg
 
 from src import config
+from src.assets import AssetManager
 from src.board import GameBoard
-from src.config import BG_PATH, ELEMENTS_PATH, resource_path
+from src.config import BG_PATH, ELEMENTS_PATH
 from src.database import get_best, insert_result
 from src.game import Game
-from src.logics import get_const_4_cell, get_size_font
+from src.logics import get_board_layout, get_font, get_size_font
+from src.profiler import FrameProfiler
+from src.scheduler import RenderScheduler
+from src.tiles import TileAtlas
+
+# Images of the main screen with the sizes they are drawn at, warmed up while the cutscenes play
+MAIN_SCREEN_ASSETS = [
+    (BG_PATH / Path("BG.jpg"), (config.WIDTH, config.HEIGHT + 2)),
+    (ELEMENTS_PATH / Path("around_arrow.png"), (43, 43)),
+    (ELEMENTS_PATH / Path("arrow.png"), (58, 58)),
+    (ELEMENTS_PATH / Path("home.png"), (38, 38)),
+]
+
+# Regions of the main screen that change while playing
+SCORES_RECT = pg.Rect(270, 76, 250, 40)
+DELTA_RECT = pg.Rect(0, 160, 260, 62)
+TIMER_RECT = pg.Rect(30, 100, 220, 60)
+PROFILER_RECT = pg.Rect(0, 0, 260, 48)
+BOARD_RECT = pg.Rect(15, 225, 490, 490)
+BOARD_ORIGIN = (21, 231)  # Top left corner of the first cell
 
 class Interface(Game):
     board: GameBoard
+    # Shared by every reset of the game, so images are only decoded and tiles only rendered once
+    assets = AssetManager()
+    tiles = TileAtlas(config.GENERAL_FONT, get_board_layout(config.BLOCKS)[0])
+    # Background with the empty cells redrawn, for boards of another size than the image's
+    board_background: pg.Surface | None = None
+    # Hint arrow for each direction, drawn on first use
+    hint_arrows: dict[str, pg.Surface] = {}
 
     # attributes of class
     def __init__(self) -> None:
         super().__init__(config.SIZE, config.FRAMERATE)
         self.blocks = config.BLOCKS
-        self.size_block = config.SIZE_BLOCK
-        self.margin = config.MARGIN
+        self.size_block, self.margin = get_board_layout(self.blocks)
         self.generalFont = config.GENERAL_FONT
         self.adjustment = lambda x, y: len(str(abs(y))) * 8 if x == 25 else len(str(abs(y))) * 7
         self.delta = 0
         self.timer = 241
-        self.last_timer_update = pg.time.get_ticks() // 1000  # Initial value for tracking time
-
-    # Updates time each cycle
-    def update_timer(self) -> None:
-        current_time = pg.time.get_ticks() // 1000  # Get current time in seconds
+        # The countdown runs on the monotonic clock, pygame's ticks need its timer set up as well
+        self.last_timer_update = int(time.monotonic())  # Initial value for tracking time
+        self.tiles.build()
+        self.scheduler = RenderScheduler()
+        self.hint: str | None = None  # Direction drawn as an arrow over the board
+
+    # Updates time each cycle, returns whether the shown time changed
+    def update_timer(self) -> bool:
+        current_time = int(time.monotonic())  # Get current time in seconds
         if current_time > self.last_timer_update:
+            # A long frame can span several seconds, all of them count
+            self.timer = max(0, self.timer - (current_time - self.last_timer_update))
             self.last_timer_update = current_time
-            self.timer -= 1  # Decrement the timer by 1 second
+            return True
+        return False
 
-    # draws timer in board
-    def draw_timer(self) -> None:
+    # draws timer in board, returns the changed region
+    def draw_timer(self) -> pg.Rect:
+        self.screen.blit(self._background(), TIMER_RECT, TIMER_RECT)
         pg.draw.rect(self.screen, config.COLORS["BLACK"], (30, 110, 220, 50))  # Adjust dimensions as needed
 
         minutes = self.timer // 60
         seconds = self.timer % 60
         timer_text = f"{minutes:02d}:{seconds:02d}"
 
-        timer_surface = pg.font.Font(self.generalFont, 32).render(timer_text, True, config.COLORS["WHITE"])
+        timer_surface = get_font(self.generalFont, 32).render(timer_text, True, config.COLORS["WHITE"])
         self.screen.blit(timer_surface, (30, 100))  # Adjust the position as needed
+        return TIMER_RECT
+
+    # draws the frame rate and frame time percentiles in the corner, returns the changed region
+    def draw_profiler(self, profiler: FrameProfiler) -> pg.Rect:
+        self.screen.blit(self._background(), PROFILER_RECT, PROFILER_RECT)
+        p50, p95, p99 = profiler.percentiles()
+        font = get_font(self.generalFont, 16)
+        lines = (f"FPS {profiler.fps():.1f}", f"p50 {p50:.2f}  p95 {p95:.2f}  p99 {p99:.2f} ms")
+        for index, line in enumerate(lines):
+            self.screen.blit(font.render(line, True, config.COLORS["GRAY"]), (6, 4 + index * 20))
+        return PROFILER_RECT
+
+    # draws the background back over the frame times, returns the changed region
+    def clear_profiler(self) -> pg.Rect:
+        self.screen.blit(self._background(), PROFILER_RECT, PROFILER_RECT)
+        return PROFILER_RECT
 
     # game over screen appears blurs background
     def draw_game_over(self) -> None:
@@ -53,12 +104,11 @@ class Interface(Game):
         self.screen.blit(blur, (0, 0))
 
         self.screen.blit(
-            pg.font.Font(self.generalFont, 60).render("Game Over!", True, config.COLORS["WHITE"]),
+            get_font(self.generalFont, 60).render("Game Over!", True, config.COLORS["WHITE"]),
             (100, 290),
         )
         pg.draw.rect(self.screen, "#8d8d8d", repeat_box, border_radius=8)
-        round_arrow = pg.image.load(resource_path(ELEMENTS_PATH / Path("around_arrow.png")))
-        self.screen.blit(pg.transform.scale(round_arrow, (43, 43)), (453, 159))
+        self.screen.blit(self.assets.image(ELEMENTS_PATH / Path("around_arrow.png"), (43, 43)), (453, 159))
         pg.display.update()
 
         insert_result(self.username, self.score)
@@ -90,24 +140,22 @@ class Interface(Game):
         back_ground_with_crown = BG_PATH / Path("rating.jpg")
         back_ground_without_crown = BG_PATH / Path("rating_nothing.jpg")
         path_bg = back_ground_with_crown if get_best(1)["name"] is not None else back_ground_without_crown
-        rating_bg = pg.image.load(resource_path(path_bg))
-        menu = pg.image.load(resource_path(ELEMENTS_PATH / Path("home.png")))
-        self.screen.blit(rating_bg, (0, 0))
-        self.screen.blit(pg.transform.scale(menu, (50, 50)), (236, 543))
+        self.screen.blit(self.assets.image(path_bg), (0, 0))
+        self.screen.blit(self.assets.image(ELEMENTS_PATH / Path("home.png"), (50, 50)), (236, 543))
 
         self.screen.blit(
-            pg.font.Font(self.generalFont, 120).render("Rating", True, config.COLORS["WHITE"]),
+            get_font(self.generalFont, 120).render("Rating", True, config.COLORS["WHITE"]),
             (86, -50),
         )
 
         for idx, player in all_players.items():
             if player["name"] is None:
                 self.screen.blit(
-                    pg.font.Font(self.generalFont, 45).render("Nothing", True, config.COLORS["WHITE"]),
+                    get_font(self.generalFont, 45).render("Nothing", True, config.COLORS["WHITE"]),
                     (180, 115 + 100 * idx),
                 )
             else:
-                name = pg.font.Font(self.generalFont, 40).render(
+                name = get_font(self.generalFont, 40).render(
                     player["name"] + ":",
                     True,
                     config.COLORS["WHITE"],
@@ -115,17 +163,17 @@ class Interface(Game):
                 if name.get_width() > 154:
                     s = player["name"] + ":"
                     self.screen.blit(
-                        pg.font.Font(self.generalFont, 28).render(s, True, config.COLORS["WHITE"]),
+                        get_font(self.generalFont, 28).render(s, True, config.COLORS["WHITE"]),
                         (117, 135 + 100 * idx),
                     )
                     size_font = 35
-                    score_txt = pg.font.Font(self.generalFont, size_font).render(
+                    score_txt = get_font(self.generalFont, size_font).render(
                         str(player["score"]),
                         True,
                         config.COLORS["WHITE"],
                     )
                     while 289 - name.get_width() + 20 + score_txt.get_width() - 117 > 309:
-                        score_txt = pg.font.Font(self.generalFont, size_font).render(
+                        score_txt = get_font(self.generalFont, size_font).render(
                             str(player["score"]),
                             True,
                             config.COLORS["WHITE"],
@@ -133,7 +181,7 @@ class Interface(Game):
                         size_font -= 2
                     y = 128 if size_font == 35 else 133
                     x = (
-                            pg.font.Font(self.generalFont, 28)
+                            get_font(self.generalFont, 28)
                             .render(player["name"] + ":", True, config.COLORS["WHITE"])
                             .get_width()
                             + 127
@@ -142,13 +190,13 @@ class Interface(Game):
                 else:
                     self.screen.blit(name, (117, 124 + 100 * idx))
                     size_font = 35
-                    score_txt = pg.font.Font(self.generalFont, size_font).render(
+                    score_txt = get_font(self.generalFont, size_font).render(
                         str(player["score"]),
                         True,
                         config.COLORS["WHITE"],
                     )
                     while 289 - name.get_width() + 20 + score_txt.get_width() - 117 > 309:
-                        score_txt = pg.font.Font(self.generalFont, size_font).render(
+                        score_txt = get_font(self.generalFont, size_font).render(
                             str(player["score"]),
                             True,
                             config.COLORS["WHITE"],
@@ -183,12 +231,11 @@ class Interface(Game):
         play_box = pg.Rect(118, 283, 289, 80)
         rating_box = pg.Rect(118, 383, 289, 80)
 
-        start_bg = pg.image.load(resource_path(BG_PATH / Path("menu.jpg")))
-        self.screen.blit(start_bg, (0, 0))
+        self.screen.blit(self.assets.image(BG_PATH / Path("menu.jpg")), (0, 0))
 
-        font = pg.font.Font(self.generalFont, 45)
+        font = get_font(self.generalFont, 45)
         self.screen.blit(
-            pg.font.Font(self.generalFont, 55).render("Inception to TTFE", True, config.COLORS["WHITE"]),
+            get_font(self.generalFont, 55).render("Inception to TTFE", True, config.COLORS["WHITE"]),
             (60, 155),
         )
         self.screen.blit(font.render("PLAY", True, config.COLORS["WHITE"]), (210, 270))
@@ -225,7 +272,7 @@ class Interface(Game):
         self.screen.fill(pg.Color('black'))
 
         # Cutscene text.
-        font = pg.font.Font(self.generalFont, 20)
+        font = get_font(self.generalFont, 20)
         texts = [
             "Boss: You have to infiltrate the TTFE",
             "and destroy it from the inside. You'll pass the",
@@ -267,7 +314,7 @@ class Interface(Game):
         self.screen.fill(pg.Color('black'))
 
         # Cutscene text.
-        font = pg.font.Font(self.generalFont, 20)
+        font = get_font(self.generalFont, 20)
         texts = [
             "5 days later...",
             " ",
@@ -318,10 +365,10 @@ class Interface(Game):
             blur.fill((0, 0, 0, 85))
             self.screen.blit(blur, (0, 0))
 
-            font_h1 = pg.font.Font(self.generalFont, 90)
+            font_h1 = get_font(self.generalFont, 90)
             text_h1 = font_h1.render("You did it! You were able to pass the test.", True, config.COLORS["WHITE"])
             self.screen.blit(text_h1, (self.width // 2 - text_h1.get_size()[0] // 2, 330))
-            font_h3 = pg.font.Font(self.generalFont, 35)
+            font_h3 = get_font(self.generalFont, 35)
             text_h3 = font_h3.render("Click any button to Continue", True, config.COLORS["WHITE"])
             self.screen.blit(text_h3, (self.width // 2 - text_h3.get_size()[0] // 2, 455))
 
@@ -341,31 +388,48 @@ class Interface(Game):
 
     # draws game boards menu
     def draw_main(self) -> None:
-        self.screen.blit(
-            pg.transform.scale(pg.image.load(resource_path(BG_PATH / Path("BG.jpg"))), (self.width, self.height + 2)),
-            (0, 0),
-        )
-        self.screen.blit(
-            pg.transform.scale(pg.image.load(resource_path(ELEMENTS_PATH / Path("around_arrow.png"))), (43, 43)),
-            (453, 159),
-        )
-        self.screen.blit(
-            pg.transform.scale(pg.image.load(resource_path(ELEMENTS_PATH / Path("arrow.png"))), (58, 58)),
-            (374, 154),
-        )
-        self.screen.blit(
-            pg.transform.scale(pg.image.load(resource_path(ELEMENTS_PATH / Path("home.png"))), (38, 38)),
-            (314, 162),
-        )
+        self.screen.blit(self._background(), (0, 0))
+        self.screen.blit(self.assets.image(ELEMENTS_PATH / Path("around_arrow.png"), (43, 43)), (453, 159))
+        self.screen.blit(self.assets.image(ELEMENTS_PATH / Path("arrow.png"), (58, 58)), (374, 154))
+        self.screen.blit(self.assets.image(ELEMENTS_PATH / Path("home.png"), (38, 38)), (314, 162))
 
         self.screen.blit(
-            pg.font.Font(self.generalFont, 17).render("HIGH SCORE", True, config.COLORS["GRAY"]),
+            get_font(self.generalFont, 17).render("HIGH SCORE", True, config.COLORS["GRAY"]),
             (402, 55),
         )
         self.screen.blit(
-            pg.font.Font(self.generalFont, 18).render("SCORE", True, config.COLORS["GRAY"]),
+            get_font(self.generalFont, 18).render("SCORE", True, config.COLORS["GRAY"]),
             (300, 55),
         )
+        self.draw_scores()
+        self.draw_board()
+
+    # Background of the main screen, also used to clear single regions before redrawing them
+    def _background(self) -> pg.Surface:
+        background = self.assets.image(BG_PATH / Path("BG.jpg"), (self.width, self.height + 2))
+        # The image has the empty cells of a config.LAYOUT_BLOCKS board drawn in
+        if self.blocks == config.LAYOUT_BLOCKS:
+            return background
+        if Interface.board_background is None:
+            surface = background.copy()
+            pg.draw.rect(surface, config.COLORS["BOARD"], BOARD_RECT, border_radius=7)
+            for row in range(self.blocks):
+                for column in range(self.blocks):
+                    cell = pg.Rect(self._cell_position(row, column), (self.size_block, self.size_block))
+                    pg.draw.rect(surface, config.COLORS["CELL"], cell, border_radius=7)
+            Interface.board_background = surface
+        return Interface.board_background
+
+    # Top left corner of a cell on the screen
+    def _cell_position(self, row: int, column: int) -> tuple[int, int]:
+        step = self.size_block + self.margin
+        return BOARD_ORIGIN[0] + column * step, BOARD_ORIGIN[1] + row * step
+
+    # draws the score, the high score and the last gain; returns the changed regions
+    def draw_scores(self) -> list[pg.Rect]:
+        background = self._background()
+        for rect in (SCORES_RECT, DELTA_RECT):
+            self.screen.blit(background, rect, rect)
 
         best_score = get_best(1)["score"]
         high_score = 0 if best_score == -1 else best_score
@@ -373,7 +437,7 @@ class Interface(Game):
 
         correct = self.adjustment(size_score, self.score)  # substitution for number score
         self.screen.blit(
-            pg.font.Font(self.generalFont, size_score).render(
+            get_font(self.generalFont, size_score).render(
                 f"{self.score}",
                 True,
                 config.COLORS["WHITE"],
@@ -383,7 +447,7 @@ class Interface(Game):
 
         correct = self.adjustment(size_high_score, high_score)  # substitution for number high score
         self.screen.blit(
-            pg.font.Font(self.generalFont, size_high_score).render(
+            get_font(self.generalFont, size_high_score).render(
                 f"{high_score}",
                 True,
                 config.COLORS["WHITE"],
@@ -394,35 +458,40 @@ class Interface(Game):
         if self.delta > 0:
             correct = len(str(abs(self.delta))) * 14  # substitution for number delta
             self.screen.blit(
-                pg.font.Font(self.generalFont, 34).render(
+                get_font(self.generalFont, 34).render(
                     f"+{self.delta}",
                     True,
                     config.COLORS["WHITE"],
                 ),
                 (115 - correct, 160),
             )
+        return [SCORES_RECT, DELTA_RECT]
 
+    # draws the cells of the board; returns the changed region
+    def draw_board(self) -> pg.Rect:
+        self.screen.blit(self._background(), BOARD_RECT, BOARD_RECT)
+        cells = []
         for row in range(self.blocks):  # Building cells
             for column in range(self.blocks):
-                value, font = get_const_4_cell(self.board[row][column], self.generalFont)
-                text = font.render(
-                    f"{value}",
-                    True,
-                    "#ebeeff",
-                )  # GRAY or WHITE
-                w = column * self.size_block + (column - 1) * self.margin + 30
-                h = row * self.size_block + (row - 1) * self.margin + 240
-                if value != 0:  # Placing numbers on cells
-                    pg.draw.rect(
-                        self.screen,
-                        config.COLORS[value],
-                        (w, h, self.size_block + 2, self.size_block + 2),
-                        border_radius=7,
-                    )
-                    font_w, font_h = text.get_size()
-                    text_x = w + (self.size_block - font_w) / 2
-                    text_y = h + (self.size_block - font_h) / 2 - 6
-                    self.screen.blit(text, (text_x, text_y))
+                value = self.board.cell(row, column)
+                if value != 0:  # Placing numbered tiles from the atlas
+                    cells.append((self.tiles.area(value), self._cell_position(row, column)))
+        atlas = self.tiles.surface  # Taken last, area() grows the atlas when a value is first drawn
+        self.screen.blits([(atlas, position, area) for area, position in cells], doreturn=False)
+        if self.hint is not None:
+            arrow = self._hint_arrow(self.hint)
+            self.screen.blit(arrow, arrow.get_rect(center=BOARD_RECT.center))
+        return BOARD_RECT
+
+    # See-through arrow pointing to a direction, drawn over the middle of the board
+    def _hint_arrow(self, direction: str) -> pg.Surface:
+        if direction not in Interface.hint_arrows:
+            arrow = pg.Surface((160, 160), pg.SRCALPHA)
+            points = [(80, 10), (150, 80), (105, 80), (105, 150), (55, 150), (55, 80), (10, 80)]
+            pg.draw.polygon(arrow, config.COLORS["HINT"], points)
+            angle = {"UP": 0, "LEFT": 90, "DOWN": 180, "RIGHT": 270}[direction]
+            Interface.hint_arrows[direction] = pg.transform.rotate(arrow, angle)
+        return Interface.hint_arrows[direction]
 
     @abstractmethod
     def update(self) -> None:
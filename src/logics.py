@@ -1,8 +1,15 @@
+from __future__ import annotations
+
 from dataclasses import dataclass
+from functools import cache
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
+
+from src.config import BLOCKS, LAYOUT_BLOCKS, MARGIN, SIZE_BLOCK
 
-import pygame as pg
+# pygame is only needed for fonts, so the board helpers stay usable without a display
+if TYPE_CHECKING:
+    import pygame as pg
 
 @dataclass(slots=True)
 class Point:  # Dataclass to represent a point
@@ -32,9 +39,9 @@ def quick_copy(data: Any) -> list:
     return [list(row) for row in mas]
 
 # Returns a tuple with indices based on the board cell number
-def get_index_from_number(num: int) -> tuple[int, int]:
+def get_index_from_number(num: int, width: int = BLOCKS) -> tuple[int, int]:
     num -= 1
-    return num // 4, num % 4
+    return num // width, num % width
 
 # Returns the main side of the swipe. top, bottom, left, right + distance.
 def get_side(dot_one: tuple, dot_two: tuple) -> tuple[str, int]:
@@ -46,8 +53,15 @@ def get_side(dot_one: tuple, dot_two: tuple) -> tuple[str, int]:
     return result_side, distance
 
 # Returns the number at the indices of the board cell.
-def get_number_from_index(x: int, y: int) -> int:
-    return x * 4 + y + 1
+def get_number_from_index(x: int, y: int, width: int = BLOCKS) -> int:
+    return x * width + y + 1
+
+# Returns the size of a cell and the margin between cells for a board of the given number
+# of blocks per row, so that any board fills the same area as the 4x4 one.
+def get_board_layout(blocks: int) -> tuple[int, int]:
+    span = LAYOUT_BLOCKS * SIZE_BLOCK + (LAYOUT_BLOCKS - 1) * MARGIN
+    margin = max(2, MARGIN * LAYOUT_BLOCKS // blocks)
+    return (span - (blocks - 1) * margin) // blocks, margin
 
 # Returns a tuple with two values to substitute the text of the values on the screen.
 def get_size_font(score_size: int, score_top_size: int) -> tuple[int, int]:
@@ -62,11 +76,18 @@ def get_size_font(score_size: int, score_top_size: int) -> tuple[int, int]:
         return 25, 20
     return 25, 25
 
-# Returns the size for the font and the font itself as a tuple.
-def get_const_4_cell(value: int, gen_font: Path) -> tuple[int, pg.font.FontType]:
-    size = 50
-    font = pg.font.Font(gen_font, size)
+# Returns the font of a file at a size, loading it only the first time it is asked for.
+@cache
+def get_font(path: Path, size: int) -> pg.font.Font:
+    import pygame as pg
+
+    if not pg.font.get_init():
+        pg.font.init()
+    return pg.font.Font(path, size)
+
+# Returns the size for the font and the font itself as a tuple, scaled for cells of size_block pixels.
+def get_const_4_cell(value: int, gen_font: Path, size_block: int = SIZE_BLOCK) -> tuple[int, pg.font.FontType]:
+    size = 50 * size_block // SIZE_BLOCK
     if value > 512:
-        size = 40
-        font = pg.font.Font(gen_font, size)
-    return value, font
\ No newline at end of file
+        size = 40 * size_block // SIZE_BLOCK
+    return value, get_font(gen_font, size)
\ No newline at end of file
@@ -1,18 +1,25 @@
-# Library for encoding and decoding JSON data
-import json
-# Library for interacting with the operating system
-import os
+import atexit
+import random
 # Library providing access to variables and functions related to the Python interpreter
 import sys
+import time
 from pathlib import Path
 
 import pygame as pg
 
 from src import config, database
-from src.board import GameBoard
-from src.config import BG_PATH, CAPTION, ELEMENTS_PATH, MIN_NAME_LENGTH, resource_path
-from src.interface import Interface
-from src.logics import get_side, quick_copy
+from src.ai import Expectimax, expected_moves_left
+from src.audio import AudioManager
+from src.bitboard import unpack
+from src.board import GameBoard, from_exponents, to_exponents, to_state
+from src.config import BG_PATH, CAPTION, ELEMENTS_PATH, MIN_NAME_LENGTH
+from src.hints import HintService
+from src.history import History
+from src.interface import MAIN_SCREEN_ASSETS, Interface
+from src.logics import get_font, get_side
+from src.profiler import AUTOPLAY, AUTOSAVE, DISPLAY, EVENTS, TIMER, FrameProfiler
+from src.replay import Replay
+from src.snapshot import Autosaver, Snapshot, pack_snapshot, unpack_snapshot, write_atomic
 
 # Dictionary containing paths to audio tracks for different game states
 audio_tracks = {
@@ -20,38 +27,73 @@ audio_tracks = {
     "menu": "music/С. В. Рахманинов - Остров мёртвых.mp3",
 }
 
-# Function to play music based on the provided track ID
-def play_music(track_id):
-    if track_id in audio_tracks:
-        pg.mixer.music.load(audio_tracks[track_id])
-        pg.mixer.music.play(-1)
-    else:
-        print(f"Music with ID '{track_id}' not found.")
+# Keys that move the board and the side each of them moves to
+KEY_SIDES = {
+    pg.K_LEFT: "LEFT",
+    pg.K_a: "LEFT",
+    pg.K_RIGHT: "RIGHT",
+    pg.K_d: "RIGHT",
+    pg.K_UP: "UP",
+    pg.K_w: "UP",
+    pg.K_DOWN: "DOWN",
+    pg.K_s: "DOWN",
+}
+AUTOPLAY_KEY = pg.K_p  # Turns the AI player on and off
+TIMED_AUTOPLAY_KEY = pg.K_t  # Switches the AI player between a fixed depth and the countdown
+UNDO_KEY = pg.K_z  # Same as the back arrow
+REDO_KEY = pg.K_y  # Brings back the last undone move
+PROFILER_KEY = pg.K_F3  # Shows and hides the frame times
+HINT_KEY = pg.K_h  # Shows and hides the suggested move
+HINT_EVENT = pg.event.custom_type()  # Posted by the hint search to wake the game loop
 
 # Main game class inheriting from Interface
 class App(Interface):
     board: GameBoard
-    copy_board: list
+    history: History
+    replay: Replay | None
+    autosaver: Autosaver
     move_mouse: bool
     position: tuple[int, int]
+    autoplay: bool
+    timed_autoplay: bool
+    ai: Expectimax | None
+    autoplay_board: int | None
+    hints: HintService
+    show_hints: bool
+    audio: AudioManager
+    profiler: FrameProfiler
+    show_profiler: bool
     def __init__(self) -> None:
         super().__init__()
-        self.board = GameBoard()
+        self.autoplay = False
+        self.timed_autoplay = False
+        self.ai = None  # Built on first use, its tables take a moment to fill
+        self.autoplay_board = None  # Board the hint process is searching the timed autoplay's move for
+        self.hints = HintService(config.HINT_DEPTH, lambda: pg.event.post(pg.event.Event(HINT_EVENT)))
+        self.show_hints = False
+        self.history = History(config.UNDO_DEPTH, config.BLOCKS ** 2)
+        self.new_board()
         self.move_mouse = False
+        self.autosaver = Autosaver(config.SAVE_PATH, config.AUTOSAVE_INTERVAL)
+        self.audio = AudioManager(audio_tracks)
+        self.audio.preload()
+        self.profiler = FrameProfiler()
+        self.show_profiler = False
+        atexit.register(self.profiler.dump, config.PROFILE_PATH)
 
     # Method to handle the screen for entering a username
     def put_name(self) -> None:
         def _render(game: Interface) -> None:
-            name_bg = pg.image.load(resource_path(BG_PATH / Path("input_username.jpg")))
-            menu = pg.image.load(resource_path(ELEMENTS_PATH / Path("home.png")))
+            name_bg = game.assets.image(BG_PATH / Path("input_username.jpg"))
+            menu = game.assets.image(ELEMENTS_PATH / Path("home.png"), (50, 50))
             game.screen.blit(
-                pg.font.Font(game.generalFont, 120).render(CAPTION, True, config.COLORS["WHITE"]),
+                get_font(game.generalFont, 120).render(CAPTION, True, config.COLORS["WHITE"]),
                 (108, 60),
             )
             game.screen.blit(name_bg, (0, 0))
-            game.screen.blit(pg.transform.scale(menu, [50, 50]), (236, 494))
+            game.screen.blit(menu, (236, 494))
             game.screen.blit(
-                pg.font.Font(game.generalFont, 45).render("OK", True, config.COLORS["WHITE"]),
+                get_font(game.generalFont, 45).render("OK", True, config.COLORS["WHITE"]),
                 (229, 371),
             )
 
@@ -62,7 +104,7 @@ class App(Interface):
         menu_box = pg.Rect(225, 483, 75, 75)
 
         _render(self)
-        font_input = pg.font.Font(self.generalFont, 48)
+        font_input = get_font(self.generalFont, 48)
         pg.draw.rect(self.screen, color := inactive_colour, input_box, 1, border_radius=15)
         pg.display.update()
 
@@ -107,36 +149,79 @@ class App(Interface):
 
     # Method to load the last saved game
     def load_game(self) -> None:
-        path = Path.cwd()
-
-        if "save.txt" in os.listdir(path):
-            with open("save.txt") as file:
-                data = json.load(file)
-                self.board = GameBoard(data["board"])
-                self.score = data["score"]
-                self.username = data["user"]
-            full_path = path / Path("save.txt")
-            Path(full_path).unlink()
+        try:
+            snapshot = unpack_snapshot(config.SAVE_PATH.read_bytes())
+        except (OSError, ValueError):
+            snapshot = None
+
+        # A game saved on a board of another size cannot be continued
+        if snapshot is not None and len(snapshot.board) == config.BLOCKS:
+            self.board = GameBoard()
+            self.board.get_mas = snapshot.board  # The saved board as it was, without new tiles
+            self.replay = None  # The moves before the save are not kept, so it cannot be replayed
+            self.score = snapshot.score
+            self.username = snapshot.user
+            self.timer = snapshot.timer
+            self.last_timer_update = int(time.monotonic())
+            self.old_score = snapshot.old_score
+            # Only the last move is saved, so it is the one that can be undone
+            if snapshot.undo_board is not None:
+                self.history.reset(to_state(snapshot.undo_board), snapshot.old_score)
+                self.remember()
+            else:
+                self.history.reset(self.board_state(), snapshot.score)
+            self.refresh_hint()
         else:
             super().__init__()
-            self.board = GameBoard()
+            self.new_board()
             self.move_mouse = False
 
+    # Method to start a new board with a fresh seed and an empty replay
+    def new_board(self) -> None:
+        seed = random.getrandbits(64)
+        self.board = GameBoard(seed=seed)
+        self.replay = Replay(seed)
+        self.history.reset(self.board_state(), 0)
+        self.refresh_hint()
+
+    # Method to save the replay of a finished game to the data folder, to audit its score later
+    def save_replay(self) -> None:
+        if self.replay is None or len(self.replay) == 0:
+            return
+        self.replay.user = self.username
+        self.replay.score = self.score
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{self.replay.seed:016x}.ttfr"
+        try:
+            write_atomic(config.REPLAYS_DIR / name, self.replay.to_bytes())
+        except OSError as exc:
+            print(f"Could not save the replay: {exc}", file=sys.stderr)
+
+    # Method to pack the current game state into a snapshot record
+    def snapshot(self) -> bytes:
+        previous = self.history.previous()
+        if previous is None:
+            undo_board, old_score = None, self.old_score
+        else:
+            board, old_score = previous
+            undo_board = unpack(board) if isinstance(board, int) else from_exponents(board, config.BLOCKS)
+        return pack_snapshot(
+            Snapshot(self.board.rows(), self.score, self.username, self.timer, undo_board, old_score),
+        )
+
     # Method to save the current game state
     def save_game(self) -> None:
-        data = {"user": self.username, "score": self.score, "board": self.board.get_mas}
-        with open("save.txt", "w") as outfile:
-            json.dump(data, outfile)
+        self.autosaver.save_now(self.snapshot())
 
     # Method to update the game state, draw the main screen, and update the display
     def update(self) -> None:
         self.board.insert_in_mas()
         self.draw_main()
+        self.draw_timer()
         pg.display.update()
 
     # Method to check for victory on the board
     def is_victory(self) -> bool:
-        return any(2048 in row for row in self.board)
+        return self.board.max_tile >= 2048
 
     # Method to draw the screen when the "around arrow" is clicked during play
     def around_arrow(self) -> None:
@@ -148,10 +233,10 @@ class App(Interface):
         self.screen.blit(blur, (0, 0))
 
         self.screen.blit(
-            pg.font.Font(self.generalFont, 53).render("Reset game?", True, config.COLORS["WHITE"]),
+            get_font(self.generalFont, 53).render("Reset game?", True, config.COLORS["WHITE"]),
             (60, 200),
         )
-        font_h3 = pg.font.Font(self.generalFont, 32)
+        font_h3 = get_font(self.generalFont, 32)
         self.screen.blit(
             font_h3.render("Are you sure you wish to", True, config.COLORS["WHITE"]),
             (60, 300),
@@ -178,7 +263,7 @@ class App(Interface):
                         make_decision = True
                     elif event.key == pg.K_RETURN:  # reset
                         super().__init__()
-                        self.board = GameBoard()
+                        self.new_board()
                         self.update()
                         make_decision = True
                 elif event.type == pg.MOUSEBUTTONDOWN:
@@ -187,17 +272,108 @@ class App(Interface):
                         make_decision = True
                     elif repeat_box.collidepoint(event.pos):  # reset
                         super().__init__()
-                        self.board = GameBoard()
+                        self.new_board()
                         self.update()
                         make_decision = True
 
+    # Method to get the current board the way the history keeps it: packed, or as exponents on a Grid
+    def board_state(self) -> int | bytes:
+        board = self.board.packed
+        return board if board is not None else to_exponents(self.board.rows())
+
+    # Method to add the current board and score to the history after a move
+    def remember(self) -> None:
+        self.history.push(self.board_state(), self.score)
+
+    # Method to show the board and score the history is at after an undo or a redo
+    def restore(self) -> None:
+        board = self.history.packed
+        if board is not None:
+            self.board.load_packed(board)
+        else:
+            self.board.load_exponents(*self.history.board_slice())
+        self.score = self.history.score
+        previous_score = self.history.previous_score()
+        self.old_score = previous_score if previous_score is not None else self.score
+        self.refresh_hint()
+        self.scheduler.mark(*self.draw_scores(), self.draw_board())
+
     # Method to revert to the previous state when the "back arrow" is clicked during play
     def back_arrow(self) -> None:
-        if self.copy_board is not None and self.copy_board != self.board.get_mas:
-            self.board.get_mas = [list(row) for row in self.copy_board]
-            self.score = self.old_score
-            self.draw_main()
-            pg.display.update()
+        if self.history.undo():
+            if self.replay is not None:
+                self.replay.record_undo()
+            self.restore()
+
+    # Method to bring back the last move taken back with the back arrow
+    def redo(self) -> None:
+        if self.history.redo():
+            if self.replay is not None:
+                self.replay.record_redo()
+            self.restore()
+
+    # Method to move the board to the given side and add the result to the history
+    def make_move(self, side: str) -> None:
+        command_side = {
+            "UP": self.board.move_up,
+            "DOWN": self.board.move_down,
+            "LEFT": self.board.move_left,
+            "RIGHT": self.board.move_right,
+        }
+        command_side[side](self)
+        moved = self.board.is_board_move
+        self.board.insert_in_mas()
+        if moved:
+            if self.replay is not None:
+                self.replay.record(side)
+            self.remember()
+            self.refresh_hint()
+        # Only the board and the scores change, the scheduler sends them to the display
+        self.scheduler.mark(*self.draw_scores(), self.draw_board())
+        if self.is_victory():
+            self.draw_victory()
+
+    # Method to let the AI player make one move while autoplay is on.
+    # The timed search can take up to a second, so it runs in the hint process and the move is
+    # made on the frame its result arrives; the short fixed-depth search fits in a frame.
+    def autoplay_step(self) -> None:
+        board = self.board.packed
+        if self.timed_autoplay and board is not None:
+            if self.autoplay_board != board:
+                self.autoplay_board = board
+                self.hints.request(board, self.move_time(), config.AI_MAX_DEPTH)
+                return
+            side = self.hints.poll()
+        else:
+            if self.ai is None:
+                self.ai = Expectimax(depth=config.AI_DEPTH)
+            side = self.ai.best_move(self.board)
+        if side is not None:
+            self.make_move(side)
+
+    # Method to work out how long the timed autoplay may think about the next move:
+    # the time left on the countdown shared by the moves expected before the next goal tile
+    def move_time(self) -> float:
+        remaining = self.timer - (time.monotonic() - self.last_timer_update)
+        return min(max(0.0, remaining) / expected_moves_left(self.board), config.AI_MOVE_TIME_LIMIT)
+
+    # Method to drop the hint for the last position and start searching one for the current board
+    def refresh_hint(self) -> None:
+        self.hint = None
+        self.hints.cancel()
+        self.autoplay_board = None
+        if self.show_hints and not self.autoplay:
+            board = self.board.packed
+            if board is None:
+                return  # Only 4x4 boards with tiles up to 16384 are searched
+            self.hints.request(board)
+
+    # Method to draw the hint once the background search has found it
+    def check_hint(self) -> None:
+        hint = self.hints.poll()
+        if hint != self.hint:
+            self.hint = hint
+            self.scheduler.mark(self.draw_board())
 
     # Method to handle all user events
     def handle_events(self) -> bool:
@@ -229,37 +405,35 @@ class App(Interface):
                     if self.position != event.pos:
                         source_swipe = get_side(self.position, event.pos)
                         if source_swipe[1] > 30:
-                            command_side = {
-                                "UP": self.board.move_up,
-                                "DOWN": self.board.move_down,
-                                "LEFT": self.board.move_left,
-                                "RIGHT": self.board.move_right,
-                            }
-                            self.copy_board = quick_copy(self.board)
-                            command_side[source_swipe[0]](self)
-                            self.update()
-                            if self.is_victory():
-                                self.draw_victory()
+                            self.make_move(source_swipe[0])
             elif event.type == pg.KEYDOWN:
                 if event.key == pg.K_ESCAPE:
                     self.save_game()
                     pg.quit()
                     sys.exit()
-                elif event.key in (pg.K_LEFT, pg.K_a):  # Left
-                    self.copy_board = quick_copy(self.board)
-                    self.board.move_left(self)
-                elif event.key in (pg.K_RIGHT, pg.K_d):  # Right
-                    self.copy_board = quick_copy(self.board)
-                    self.board.move_right(self)
-                elif event.key in (pg.K_UP, pg.K_w):  # Up
-                    self.copy_board = quick_copy(self.board)
-                    self.board.move_up(self)
-                elif event.key in (pg.K_DOWN, pg.K_s):  # Down
-                    self.copy_board = quick_copy(self.board)
-                    self.board.move_down(self)
-                self.update()
-                if self.is_victory():
-                    self.draw_victory()
+                elif event.key in KEY_SIDES:  # Arrows and WASD
+                    self.make_move(KEY_SIDES[event.key])
+                elif event.key == UNDO_KEY:
+                    self.back_arrow()
+                elif event.key == REDO_KEY:
+                    self.redo()
+                elif event.key == PROFILER_KEY:
+                    self.show_profiler = not self.show_profiler
+                    if self.show_profiler:
+                        self.scheduler.mark(self.draw_profiler(self.profiler))
+                    else:
+                        self.scheduler.mark(self.clear_profiler())
+                elif event.key == AUTOPLAY_KEY and self.blocks == 4:  # The AI only plays the packed 4x4 board
+                    self.autoplay = not self.autoplay
+                    self.refresh_hint()
+                    self.scheduler.mark(self.draw_board())
+                elif event.key == TIMED_AUTOPLAY_KEY:
+                    self.timed_autoplay = not self.timed_autoplay
+                    self.refresh_hint()
+                elif event.key == HINT_KEY and self.blocks == 4:
+                    self.show_hints = not self.show_hints
+                    self.refresh_hint()
+                    self.scheduler.mark(self.draw_board())
         return False
 
     # timer checker to stop game
@@ -272,26 +446,55 @@ class App(Interface):
     def run(self) -> None:
         try:
             while True:
-                pg.mixer.music.stop()
+                self.audio.stop()
                 self.load_game()
                 if self.username is None:
-                    play_music("menu")
+                    self.audio.play("menu")
                     self.draw_menu()
+                    self.assets.warm_up(MAIN_SCREEN_ASSETS)
                     self.show_cutscene_one()
                     self.show_cutscene_Two()
-                    play_music("game")
+                    self.audio.play("game")
                 self.draw_main()
+                self.draw_timer()
+                pg.display.update()
+                self.autosaver.start()
+                profiler = self.profiler
                 while self.board.are_there_zeros() and self.board.can_move() and self.time_check():
-                    pg.display.update()
+                    profiler.start_frame()
                     if self.handle_events() is True:
-                        pg.mixer.music.stop()
+                        self.hints.cancel()
+                        self.audio.stop()
+                        self.save_replay()
+                        self.autosaver.discard()
                         break
-                    self.update_timer()
-                    self.draw_timer()
-                    pg.display.update()
-                    self.clock.tick(self.framerate)
+                    if self.show_hints and not self.autoplay:  # While autoplay is on the process searches its moves
+                        self.check_hint()
+                    profiler.lap(EVENTS)
+                    if self.autoplay:
+                        self.autoplay_step()
+                    profiler.lap(AUTOPLAY)
+                    if self.update_timer():
+                        self.scheduler.mark(self.draw_timer())
+                        if self.show_profiler:  # Refreshed with the countdown, once a second
+                            self.scheduler.mark(self.draw_profiler(profiler))
+                    profiler.lap(TIMER)
+                    self.scheduler.flush()
+                    profiler.lap(DISPLAY)
+                    self.autosaver.submit(self.snapshot())
+                    profiler.lap(AUTOSAVE)
+                    profiler.end_frame()
+                    if self.autoplay:
+                        self.clock.tick(self.framerate)
+                    else:
+                        # Nothing changes until the player acts or the countdown ticks
+                        self.scheduler.wait()
                 else:
+                    self.hints.cancel()
+                    self.save_replay()
+                    self.autosaver.discard()
                     self.draw_game_over()
         except Exception as exc:
             self.save_game()
+            database.flush()
             raise exc from None
\ No newline at end of file
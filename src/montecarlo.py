@@ -0,0 +1,132 @@
+from __future__ import annotations
+# Monte Carlo player for the 4x4 board: every legal move is followed by many games of random
+# moves played to the end on the packed form of src.bitboard, and the move whose games score
+# most on average is chosen. The games are spread over a pool of worker processes that is
+# started on the first decision and kept for the following ones.
+
+import os
+import sys
+import time
+from multiprocessing.pool import Pool
+from random import Random
+from typing import Iterable
+
+from src import bitboard
+from src.ai import PROBABILITY_2
+from src.bitboard import DIRECTIONS, MOVES, empty_bits, select_bit
+
+# Puts a 2 or a 4 into a random empty cell of a packed board, which must have one
+def _spawn(board: int, rng: Random) -> int:
+    empty = empty_bits(board)
+    shift = select_bit(empty, rng.randrange(empty.bit_count()))
+    return board | (1 if rng.random() < PROBABILITY_2 else 2) << shift
+
+# Plays random moves from a board that has just been moved until the game is over, with the
+# rule of App.run that it ends once the board is full; returns the score gained on the way.
+def rollout(board: int, rng: Random) -> int:
+    score = 0
+    moves = [MOVES[direction] for direction in DIRECTIONS]
+    while True:
+        board = _spawn(board, rng)
+        if not empty_bits(board):
+            return score
+        options = [(new_board, gained) for new_board, gained in (move(board) for move in moves) if new_board != board]
+        if not options:
+            return score
+        board, gained = rng.choice(options)
+        score += gained
+
+# Plays count rollouts from a board, or fewer if seconds pass first, but always at least one.
+# The task carries its own seed, so the results do not depend on which worker runs it.
+# Returns the total score of the rollouts and how many were played.
+def run_rollouts(task: tuple[int, int | None, float | None, int]) -> tuple[int, int]:
+    board, count, seconds, seed = task
+    bitboard.build_tables()
+    rng = Random(seed)
+    limit = sys.maxsize if count is None else count
+    deadline = None if seconds is None else time.perf_counter() + seconds
+    total = done = 0
+    while done < limit and (done == 0 or deadline is None or time.perf_counter() < deadline):
+        total += rollout(board, rng)
+        done += 1
+    return total, done
+
+# Splits count rollouts into at most parts nearly equal shares
+def _split(count: int | None, parts: int) -> list[int | None]:
+    if count is None:
+        return [None] * parts
+    parts = min(parts, count)
+    return [count // parts + (i < count % parts) for i in range(parts)]
+
+class MonteCarlo:
+    # rollouts is the number of random games per legal move and seconds the time a decision
+    # may take; either can be None, not both. With workers=1 the games are played in this
+    # process, which is what a process that is itself a pool worker must use.
+    def __init__(
+        self,
+        rollouts: int | None = 200,
+        seconds: float | None = None,
+        workers: int | None = None,
+        rng: Random | None = None,
+        seed: int | None = None,
+    ) -> None:
+        if rollouts is None and seconds is None:
+            msg = "Invalid arguments, rollouts or seconds must be given"
+            raise ValueError(msg)
+        if rollouts is not None and rollouts < 1:
+            msg = "Invalid argument rollouts, must be at least 1"
+            raise ValueError(msg)
+        self.rollouts = rollouts
+        self.seconds = seconds
+        self.workers = max(1, workers if workers is not None else os.cpu_count() or 1)
+        self.rng = rng if rng is not None else Random(seed)
+        self._pool: Pool | None = None
+        bitboard.build_tables()
+
+    def __enter__(self) -> MonteCarlo:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    # Stops the worker processes; the next decision starts new ones
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    # Returns the best direction for a board (a GameBoard, its rows or a packed board),
+    # or None if no move changes the board.
+    def best_move(self, board: int | Iterable[list[int]]) -> str | None:
+        if not isinstance(board, int):
+            board = bitboard.pack(board)
+        legal = []
+        for direction in DIRECTIONS:
+            new_board, score = MOVES[direction](board)
+            if new_board != board:
+                legal.append((direction, new_board, score))
+        if len(legal) < 2:
+            return legal[0][0] if legal else None
+
+        # Each worker gets about one share of every move, so the time is split between the moves
+        shares = _split(self.rollouts, self.workers)
+        seconds = None if self.seconds is None else self.seconds / len(legal)
+        tasks = [(new_board, share, seconds, self.rng.getrandbits(64)) for _, new_board, _ in legal for share in shares]
+        results = self._map(tasks)
+
+        best_direction = None
+        best_value = float("-inf")
+        for i, (direction, _, score) in enumerate(legal):
+            totals = results[i * len(shares):(i + 1) * len(shares)]
+            value = score + sum(total for total, _ in totals) / sum(done for _, done in totals)
+            if value > best_value:
+                best_direction, best_value = direction, value
+        return best_direction
+
+    def _map(self, tasks: list[tuple[int, int | None, float | None, int]]) -> list[tuple[int, int]]:
+        if self.workers == 1:
+            return [run_rollouts(task) for task in tasks]
+        if self._pool is None:
+            self._pool = Pool(self.workers, bitboard.build_tables)
+        return self._pool.map(run_rollouts, tasks, chunksize=1)
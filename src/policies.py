@@ -0,0 +1,76 @@
+from __future__ import annotations
+# Move policies for headless play. A policy takes the rows of a board and returns
+# the side to move to, or None if it has no move to make.
+
+import inspect
+from collections.abc import Callable
+from random import Random
+
+from src.ai import Expectimax
+from src.bitboard import DIRECTIONS
+from src.board import apply_move
+from src.montecarlo import MonteCarlo
+
+Policy = Callable[[list[list[int]]], "str | None"]
+
+# Returns the sides that change the board, with the score each of them gains
+def legal_moves(mas: list[list[int]]) -> dict[str, int]:
+    result = {}
+    for side in DIRECTIONS:
+        _, score, moved = apply_move(mas, side)
+        if moved:
+            result[side] = score
+    return result
+
+# Plays a random legal move
+def random_policy(rng: Random) -> Policy:
+    def policy(mas: list[list[int]]) -> str | None:
+        moves = list(legal_moves(mas))
+        return rng.choice(moves) if moves else None
+    return policy
+
+# Plays the legal move that scores most right now, breaking ties at random
+def greedy_policy(rng: Random) -> Policy:
+    def policy(mas: list[list[int]]) -> str | None:
+        moves = legal_moves(mas)
+        if not moves:
+            return None
+        best = max(moves.values())
+        return rng.choice([side for side, score in moves.items() if score == best])
+    return policy
+
+# Plays the move chosen by the expectimax search of src.ai
+def expectimax_policy(rng: Random, depth: int = 2) -> Policy:
+    search = Expectimax(depth=depth)
+    return search.best_move
+
+# Plays the move whose random rollouts score best on average. The rollouts run in the calling
+# process unless workers is more than 1; a process that is itself a pool worker must keep 1.
+def montecarlo_policy(rng: Random, rollouts: int = 100, workers: int = 1) -> Policy:
+    player = MonteCarlo(rollouts=rollouts, workers=workers, rng=rng)
+    return player.best_move
+
+# Policies by name; register_policy adds more
+POLICIES: dict[str, Callable[..., Policy]] = {
+    "random": random_policy,
+    "greedy": greedy_policy,
+    "expectimax": expectimax_policy,
+    "montecarlo": montecarlo_policy,
+}
+
+def register_policy(name: str, factory: Callable[..., Policy]) -> None:
+    POLICIES[name] = factory
+
+# Returns the names of the options the named policy takes besides its random generator
+def policy_options(name: str) -> tuple[str, ...]:
+    parameters = list(inspect.signature(POLICIES[name]).parameters)
+    return tuple(parameters[1:])
+
+# Builds the named policy with its own random generator and options
+def make_policy(name: str, rng: Random, **options: int) -> Policy:
+    try:
+        factory = POLICIES[name]
+    except KeyError as exc:
+        msg = f"Unknown policy {name!r}, must be one of {', '.join(POLICIES)}"
+        raise ValueError(msg) from exc
+    return factory(rng, **options)
@@ -0,0 +1,77 @@
+from __future__ import annotations
+# Per-stage frame timing. Durations go into preallocated ring buffers written only by the
+# game loop, so recording takes no locks and allocates nothing; a cumulative histogram of
+# the whole session is kept next to them and can be written to a file at exit.
+
+import csv
+import time
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+# Stages of one iteration of App.run, in the order they run
+STAGES = ("events", "autoplay", "timer", "display", "autosave")
+EVENTS, AUTOPLAY, TIMER, DISPLAY, AUTOSAVE = range(len(STAGES))
+# Upper bounds of the histogram buckets in milliseconds; the last bucket has no bound
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 33, 50, 100, 250)
+FRAME = -1  # Stage index meaning the whole frame
+
+class FrameProfiler:
+    def __init__(self, stages: tuple[str, ...] = STAGES, size: int = 1024) -> None:
+        self.stages = stages
+        self.size = size
+        self.count = 0  # Frames recorded since the start
+        # One buffer per stage and a last one for whole frames, in seconds
+        self._times = [array("d", bytes(8 * size)) for _ in range(len(stages) + 1)]
+        self._starts = array("d", bytes(8 * size))  # When each frame started, for the frame rate
+        self._histograms = [array("Q", bytes(8 * (len(BUCKETS_MS) + 1))) for _ in range(len(stages) + 1)]
+        self._bounds = [bound / 1000 for bound in BUCKETS_MS]
+        self._frame_start = 0.0
+        self._last = 0.0
+
+    def start_frame(self) -> None:
+        self._frame_start = self._last = time.perf_counter()
+
+    # Records the time since the previous lap, or since the start of the frame, for a stage
+    def lap(self, stage: int) -> None:
+        now = time.perf_counter()
+        elapsed = now - self._last
+        self._last = now
+        self._times[stage][self.count % self.size] = elapsed
+        self._histograms[stage][bisect_left(self._bounds, elapsed)] += 1
+
+    # Records the whole frame: the sum of its stages, without the time spent waiting after them
+    def end_frame(self) -> None:
+        slot = self.count % self.size
+        elapsed = self._last - self._frame_start
+        self._times[FRAME][slot] = elapsed
+        self._starts[slot] = self._frame_start
+        self._histograms[FRAME][bisect_left(self._bounds, elapsed)] += 1
+        self.count += 1
+
+    # Returns the given percentiles of the recent frames (or of one stage) in milliseconds
+    def percentiles(self, points: tuple[int, ...] = (50, 95, 99), stage: int = FRAME) -> list[float]:
+        recent = sorted(self._times[stage][:min(self.count, self.size)])
+        if not recent:
+            return [0.0] * len(points)
+        return [recent[min(len(recent) - 1, len(recent) * point // 100)] * 1000 for point in points]
+
+    # Returns the frames per second over the recent frames
+    def fps(self) -> float:
+        frames = min(self.count, self.size)
+        if frames < 2:
+            return 0.0
+        newest = self._starts[(self.count - 1) % self.size]
+        oldest = self._starts[(self.count - frames) % self.size]
+        return (frames - 1) / (newest - oldest) if newest > oldest else 0.0
+
+    # Writes the histogram of the whole session as CSV: one row per bucket, one column per stage
+    def dump(self, path: Path) -> None:
+        if self.count == 0:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(("up_to_ms", "frame", *self.stages))
+            for bucket, bound in enumerate((*BUCKETS_MS, "inf")):
+                writer.writerow((bound, self._histograms[FRAME][bucket], *(h[bucket] for h in self._histograms[:-1])))
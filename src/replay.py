@@ -0,0 +1,115 @@
+from __future__ import annotations
+# Compact replays: the seed of a game plus its moves at 2 bits each, and a replayer that
+# rebuilds any position by playing them again on a GameBoard, without rendering.
+
+import struct
+from typing import NamedTuple
+
+from src.bitboard import DIRECTIONS
+from src.board import GameBoard
+
+MAGIC = b"TTFR"
+VERSION = 1
+USERNAME_BYTES = 32
+# magic, version, seed, username, claimed score, number of moves, number of undos and redos
+HEADER = struct.Struct(f"<4sBQ{USERNAME_BYTES}sIII")
+EVENT = struct.Struct("<I")
+REDO_FLAG = 1 << 31  # Set in the position of a redo event
+
+# Steps that are not moves
+UNDO = "UNDO"
+REDO = "REDO"
+
+class ReplayState(NamedTuple):
+    board: list[list[int]]
+    score: int
+    moves: int  # Moves applied, undone ones included
+
+# Seed and moves of one game. Only moves that changed the board are recorded. An undo or
+# a redo is stored as the number of moves made before it, because the tiles spawned
+# afterwards depend on the generator having been used by the undone moves.
+class Replay:
+    def __init__(self, seed: int, user: str | None = None, score: int = 0) -> None:
+        self.seed = seed
+        self.user = user
+        self.score = score
+        self.moves = bytearray()  # Indices into DIRECTIONS
+        self.events: list[int] = []  # Undos and redos, redos carry REDO_FLAG
+
+    def __len__(self) -> int:
+        return len(self.moves) + len(self.events)
+
+    def record(self, direction: str) -> None:
+        self.moves.append(DIRECTIONS.index(direction))
+
+    def record_undo(self) -> None:
+        self.events.append(len(self.moves))
+
+    def record_redo(self) -> None:
+        self.events.append(len(self.moves) | REDO_FLAG)
+
+    # Returns the moves, undos and redos in the order they were made: a direction, UNDO or REDO
+    def steps(self) -> list[str]:
+        result: list[str] = []
+        events = iter(self.events)
+        event = next(events, None)
+        for index, code in enumerate(self.moves):
+            while event is not None and event & ~REDO_FLAG == index:
+                result.append(REDO if event & REDO_FLAG else UNDO)
+                event = next(events, None)
+            result.append(DIRECTIONS[code])
+        while event is not None:
+            result.append(REDO if event & REDO_FLAG else UNDO)
+            event = next(events, None)
+        return result
+
+    def to_bytes(self) -> bytes:
+        user = (self.user or "").encode()[:USERNAME_BYTES].decode(errors="ignore").encode()
+        header = HEADER.pack(MAGIC, VERSION, self.seed, user, self.score, len(self.moves), len(self.events))
+        packed = bytearray((len(self.moves) + 3) // 4)
+        for index, code in enumerate(self.moves):
+            packed[index // 4] |= code << (2 * (index % 4))
+        return header + bytes(packed) + b"".join(EVENT.pack(event) for event in self.events)
+
+    # Reads a replay; raises ValueError if the data is not a replay this version can read
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Replay:
+        try:
+            magic, version, seed, user, score, move_count, event_count = HEADER.unpack_from(data)
+        except struct.error as exc:
+            msg = "Invalid replay header"
+            raise ValueError(msg) from exc
+        packed_size = (move_count + 3) // 4
+        if magic != MAGIC or version != VERSION or len(data) != HEADER.size + packed_size + EVENT.size * event_count:
+            msg = "Invalid replay header"
+            raise ValueError(msg)
+        replay = cls(seed, user.rstrip(b"\0").decode() or None, score)
+        packed = data[HEADER.size:HEADER.size + packed_size]
+        replay.moves = bytearray((packed[i // 4] >> (2 * (i % 4))) & 3 for i in range(move_count))
+        offset = HEADER.size + packed_size
+        replay.events = [EVENT.unpack_from(data, offset + EVENT.size * i)[0] for i in range(event_count)]
+        return replay
+
+# Plays a replay again and returns the position after the first `upto` steps (all of them by default).
+# Moves go through the same GameBoard.move and insert_in_mas as in the game, so the spawns match.
+def replay_game(replay: Replay, upto: int | None = None) -> ReplayState:
+    board = GameBoard(seed=replay.seed)
+    score = 0
+    moves = 0
+    # Every position reached so far, undo and redo move through it like the game's history
+    states: list[tuple[list[list[int]], int]] = [([list(row) for row in board.get_mas], score)]
+    current = 0
+    for step in replay.steps()[:upto]:
+        if step in (UNDO, REDO):
+            current += -1 if step == UNDO else 1
+            mas, score = states[current]
+            board.get_mas = [list(row) for row in mas]
+            continue
+        gained = board.move(step)
+        board.insert_in_mas()
+        score += gained
+        moves += 1
+        del states[current + 1:]
+        states.append(([list(row) for row in board.get_mas], score))
+        current += 1
+    return ReplayState(board.get_mas, score, moves)
@@ -0,0 +1,34 @@
+from __future__ import annotations
+# Collects the screen regions changed during a frame and sleeps until there is something to draw.
+
+import time
+
+import pygame as pg
+
+class RenderScheduler:
+    def __init__(self) -> None:
+        self._dirty: list[pg.Rect] = []
+        # Nothing in the game reacts to the mouse moving, so it should not wake the loop
+        pg.event.set_blocked(pg.MOUSEMOTION)
+
+    # Remembers regions to send to the display on the next flush
+    def mark(self, *rects: pg.Rect) -> None:
+        self._dirty.extend(rects)
+
+    # Sends the changed regions to the display; returns whether there were any
+    def flush(self) -> bool:
+        if not self._dirty:
+            return False
+        pg.display.update(self._dirty)
+        self._dirty.clear()
+        return True
+
+    # Blocks until an event arrives or the next second of the countdown starts.
+    # Events are put back in order so that the usual event handling still sees them.
+    def wait(self) -> None:
+        timeout = 1000 - int(time.monotonic() * 1000) % 1000
+        event = pg.event.wait(timeout)
+        if event.type == pg.NOEVENT:
+            return
+        for pending in [event, *pg.event.get()]:
+            pg.event.post(pending)
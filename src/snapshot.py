@@ -0,0 +1,137 @@
+from __future__ import annotations
+# Fixed-size binary snapshots of a game in progress, written atomically and autosaved in the background.
+
+import os
+import struct
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from typing import NamedTuple
+
+from src.board import from_exponents, to_exponents
+
+MAGIC = b"TTFE"
+VERSION = 1
+USERNAME_BYTES = 32
+# magic, version, blocks per row, score, timer, username, has undo, undo score;
+# followed by the exponents of the board and of the undo board, blocks * blocks bytes each
+HEADER = struct.Struct(f"<4sBBIh{USERNAME_BYTES}s?I")
+
+class Snapshot(NamedTuple):
+    board: list[list[int]]
+    score: int
+    user: str | None
+    timer: int
+    undo_board: list[list[int]] | None
+    old_score: int
+
+# Returns the record for a snapshot, its size depends on the size of the board
+def pack_snapshot(snapshot: Snapshot) -> bytes:
+    user = (snapshot.user or "").encode()[:USERNAME_BYTES].decode(errors="ignore").encode()
+    blocks = len(snapshot.board)
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        blocks,
+        snapshot.score,
+        snapshot.timer,
+        user,
+        snapshot.undo_board is not None,
+        snapshot.old_score,
+    )
+    undo_board = bytes(blocks * blocks) if snapshot.undo_board is None else to_exponents(snapshot.undo_board)
+    return header + to_exponents(snapshot.board) + undo_board
+
+# Returns the snapshot in a record; raises ValueError if it is not a snapshot this version can read
+def unpack_snapshot(data: bytes) -> Snapshot:
+    try:
+        magic, version, blocks, score, timer, user, has_undo, old_score = HEADER.unpack_from(data)
+    except struct.error as exc:
+        msg = "Invalid snapshot header"
+        raise ValueError(msg) from exc
+    cells = blocks * blocks
+    if version != VERSION or len(data) != HEADER.size + 2 * cells:
+        msg = f"Invalid snapshot of version {version} and size {len(data)}"
+        raise ValueError(msg)
+    board = data[HEADER.size:HEADER.size + cells]
+    undo_board = data[HEADER.size + cells:]
+    if magic != MAGIC or blocks < 2:
+        msg = "Invalid snapshot header"
+        raise ValueError(msg)
+    name = user.rstrip(b"\0").decode()
+    return Snapshot(
+        from_exponents(board, blocks),
+        score,
+        name or None,
+        timer,
+        from_exponents(undo_board, blocks) if has_undo else None,
+        old_score,
+    )
+
+# Replaces the file with data so that it always holds either the old or the new content
+def write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_name, path)
+    except BaseException:
+        Path(temp_name).unlink(missing_ok=True)
+        raise
+
+# Writes the latest submitted snapshot every interval seconds on a background thread
+class Autosaver:
+    def __init__(self, path: Path, interval: float) -> None:
+        self.path = path
+        self.interval = interval
+        self._latest: bytes | None = None
+        self._written: bytes | None = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    # Hands over the current state; cheap enough to call every frame
+    def submit(self, data: bytes) -> None:
+        self._latest = data
+
+    # Writes data right away, e.g. when the game is closed
+    def save_now(self, data: bytes) -> None:
+        with self._lock:
+            self._latest = data
+            self._write(data)
+
+    # Forgets the game and removes its snapshot, e.g. when it is over
+    def discard(self) -> None:
+        with self._lock:
+            self._latest = self._written = None
+            self.path.unlink(missing_ok=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                data = self._latest
+                if data is not None and data != self._written:
+                    try:
+                        self._write(data)
+                    except OSError as exc:
+                        print(f"Autosave to {self.path} failed: {exc}", file=sys.stderr)
+
+    def _write(self, data: bytes) -> None:
+        write_atomic(self.path, data)
+        self._written = data
@@ -0,0 +1,103 @@
+from __future__ import annotations
+# The 8 rotations and reflections of the packed 4x4 board. Boards that are mirror images or
+# rotations of each other play the same, so caches can store them under one key: the
+# smallest packed value among the 8, with the move directions turned to match.
+
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+from src import bitboard
+from src.bitboard import DIRECTIONS, transpose
+
+# A symmetry is a number from 0 to 7 whose bits name the steps, applied in this order:
+# 4 transposes, then 1 mirrors left and right, then 2 flips up and down.
+TRANSPOSE, MIRROR, FLIP = 4, 1, 2
+SYMMETRIES = range(8)
+
+# Reverses the order of the cells in every row.
+def mirror(board: int) -> int:
+    board = ((board & 0x0F0F_0F0F_0F0F_0F0F) << 4) | ((board >> 4) & 0x0F0F_0F0F_0F0F_0F0F)
+    return ((board & 0x00FF_00FF_00FF_00FF) << 8) | ((board >> 8) & 0x00FF_00FF_00FF_00FF)
+
+# Reverses the order of the rows.
+def flip(board: int) -> int:
+    board = ((board & 0x0000_FFFF_0000_FFFF) << 16) | ((board >> 16) & 0x0000_FFFF_0000_FFFF)
+    return ((board & 0xFFFF_FFFF) << 32) | (board >> 32)
+
+# Returns the packed board after a symmetry.
+def transform(board: int, symmetry: int) -> int:
+    if symmetry & TRANSPOSE:
+        board = transpose(board)
+    if symmetry & MIRROR:
+        board = mirror(board)
+    if symmetry & FLIP:
+        board = flip(board)
+    return board
+
+# Returns the board after every symmetry, in the order of their numbers.
+def variants(board: int) -> tuple[int, ...]:
+    result = []
+    for base in (board, transpose(board)):
+        mirrored = mirror(base)
+        result.extend((base, mirrored, flip(base), flip(mirrored)))
+    return tuple(result)
+
+# Returns the canonical form of a packed board: the smallest of its variants.
+def canonical(board: int) -> int:
+    transposed = transpose(board)
+    mirrored = mirror(board)
+    mirrored_transposed = mirror(transposed)
+    return min(
+        board, mirrored, flip(board), flip(mirrored),
+        transposed, mirrored_transposed, flip(transposed), flip(mirrored_transposed),
+    )
+
+def _direction_map(symmetry: int) -> dict[str, str]:
+    swaps = []
+    if symmetry & TRANSPOSE:
+        swaps.append({"UP": "LEFT", "LEFT": "UP", "DOWN": "RIGHT", "RIGHT": "DOWN"})
+    if symmetry & MIRROR:
+        swaps.append({"LEFT": "RIGHT", "RIGHT": "LEFT"})
+    if symmetry & FLIP:
+        swaps.append({"UP": "DOWN", "DOWN": "UP"})
+    result = {}
+    for direction in DIRECTIONS:
+        mapped = direction
+        for swap in swaps:
+            mapped = swap.get(mapped, mapped)
+        result[direction] = mapped
+    return result
+
+# For each symmetry, the direction on the transformed board that makes the same move as a
+# direction on the original one, and the other way round.
+FORWARD = tuple(_direction_map(symmetry) for symmetry in SYMMETRIES)
+BACKWARD = tuple({mapped: direction for direction, mapped in forward.items()} for forward in FORWARD)
+
+# Immutable, hashable key of a 4x4 board under its symmetries. Keys of boards that are
+# rotations or mirror images of each other are equal; symmetry remembers how this board
+# was turned into the canonical one, so directions can be translated in both ways.
+@dataclass(frozen=True, slots=True)
+class BoardKey:
+    board: int  # The canonical board, packed
+    symmetry: int = field(default=0, compare=False)
+
+    # Returns the key of a board (a GameBoard, its rows or a packed board)
+    @classmethod
+    def of(cls, board: int | Iterable[list[int]]) -> BoardKey:
+        if not isinstance(board, int):
+            board = bitboard.pack(board)
+        boards = variants(board)
+        key = min(boards)
+        return cls(key, boards.index(key))
+
+    # Returns the direction on the canonical board for a direction on the original one
+    def to_canonical(self, direction: str) -> str:
+        return FORWARD[self.symmetry][direction]
+
+    # Returns the direction on the original board for a direction on the canonical one
+    def to_original(self, direction: str) -> str:
+        return BACKWARD[self.symmetry][direction]
+
+    # Returns the rows of the canonical board
+    def rows(self) -> list[list[int]]:
+        return bitboard.unpack(self.board)
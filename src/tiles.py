@@ -0,0 +1,56 @@
+from __future__ import annotations
+# Atlas of pre-rendered board tiles: one surface with a rounded cell and its centred number for every value.
+
+from pathlib import Path
+
+import pygame as pg
+
+from src import config
+from src.logics import get_const_4_cell
+
+class TileAtlas:
+    surface: pg.Surface | None
+
+    def __init__(self, font_path: Path, size_block: int) -> None:
+        self.font_path = font_path
+        self.size_block = size_block
+        self.tile_size = size_block + 2
+        self.surface = None
+        self._areas: dict[int, pg.Rect] = {}
+
+    # Renders the tiles from 2 to 2048; needs the display, does nothing if already built
+    def build(self) -> None:
+        if self.surface is None:
+            values = [value for value in config.COLORS if isinstance(value, int) and value != 0]
+            self._extend(values)
+
+    # Returns the part of the atlas surface holding the tile of value, rendering it first if needed
+    def area(self, value: int) -> pg.Rect:
+        rect = self._areas.get(value)
+        if rect is None:
+            self._extend([value])
+            rect = self._areas[value]
+        return rect
+
+    def _extend(self, values: list[int]) -> None:
+        start = len(self._areas)
+        surface = pg.Surface((self.tile_size * (start + len(values)), self.tile_size), pg.SRCALPHA)
+        surface.fill((0, 0, 0, 0))
+        if self.surface is not None:
+            surface.blit(self.surface, (0, 0))
+        for index, value in enumerate(values, start):
+            rect = pg.Rect(index * self.tile_size, 0, self.tile_size, self.tile_size)
+            self._render(surface, rect, value)
+            self._areas[value] = rect
+        self.surface = surface.convert_alpha()
+
+    def _render(self, surface: pg.Surface, rect: pg.Rect, value: int) -> None:
+        # Values above 2048 have no colour of their own and use the last one
+        color = config.COLORS.get(value, config.COLORS[2048])
+        pg.draw.rect(surface, color, rect, border_radius=7)
+        _, font = get_const_4_cell(value, self.font_path, self.size_block)
+        text = font.render(f"{value}", True, config.COLORS["WHITE"])
+        font_w, font_h = text.get_size()
+        text_x = rect.x + (self.size_block - font_w) / 2
+        text_y = rect.y + (self.size_block - font_h) / 2 - 6 * self.size_block // config.SIZE_BLOCK
+        surface.blit(text, (text_x, text_y))
@@ -0,0 +1 @@
+# Run with python -m pytest from the repository root.
@@ -0,0 +1,93 @@
+from __future__ import annotations
+# The list engine of the first release of GameBoard, kept as the reference the faster
+# engines are checked against. Each move works on a copy and returns (new rows, score).
+
+from random import Random
+
+def _copy(mas: list[list[int]]) -> list[list[int]]:
+    return [list(row) for row in mas]
+
+def move_left(mas: list[list[int]]) -> tuple[list[list[int]], int]:
+    mas = _copy(mas)
+    score = 0
+    for row in mas:
+        while 0 in row:
+            row.remove(0)
+        while len(row) != 4:
+            row.append(0)
+    for x in range(4):
+        for y in range(3):
+            if mas[x][y] != 0 and mas[x][y] == mas[x][y + 1]:
+                mas[x][y] *= 2
+                score += mas[x][y]
+                mas[x].pop(y + 1)
+                mas[x].append(0)
+    return mas, score
+
+def move_right(mas: list[list[int]]) -> tuple[list[list[int]], int]:
+    mas = _copy(mas)
+    score = 0
+    for row in mas:
+        while 0 in row:
+            row.remove(0)
+        while len(row) != 4:
+            row.insert(0, 0)
+    for x in range(4):
+        for y in range(3, 0, -1):
+            if mas[x][y] != 0 and mas[x][y] == mas[x][y - 1]:
+                mas[x][y] *= 2
+                score += mas[x][y]
+                mas[x].pop(y - 1)
+                mas[x].insert(0, 0)
+    return mas, score
+
+def move_up(mas: list[list[int]]) -> tuple[list[list[int]], int]:
+    mas = _copy(mas)
+    score = 0
+    for y in range(4):
+        column = [mas[x][y] for x in range(4) if mas[x][y] != 0]
+        while len(column) != 4:
+            column.append(0)
+        for x in range(3):
+            if column[x] != 0 and column[x] == column[x + 1]:
+                column[x] *= 2
+                score += column[x]
+                column.pop(x + 1)
+                column.append(0)
+        for x in range(4):
+            mas[x][y] = column[x]
+    return mas, score
+
+def move_down(mas: list[list[int]]) -> tuple[list[list[int]], int]:
+    mas = _copy(mas)
+    score = 0
+    for y in range(4):
+        column = [mas[x][y] for x in range(4) if mas[x][y] != 0]
+        while len(column) != 4:
+            column.insert(0, 0)
+        for x in range(3, 0, -1):
+            if column[x] != 0 and column[x] == column[x - 1]:
+                column[x] *= 2
+                score += column[x]
+                column.pop(x - 1)
+                column.insert(0, 0)
+        for x in range(4):
+            mas[x][y] = column[x]
+    return mas, score
+
+MOVES = {
+    "LEFT": move_left,
+    "RIGHT": move_right,
+    "UP": move_up,
+    "DOWN": move_down,
+}
+
+# Returns count random 4x4 boards with tiles up to 2 ** max_exponent, a third of the cells empty on average
+def random_boards(count: int, seed: int = 0, max_exponent: int = 14) -> list[list[list[int]]]:
+    rng = Random(seed)
+    boards = []
+    for _ in range(count):
+        # Few distinct tiles make merges likely, so some boards use only the smallest ones
+        top = rng.randint(1, max_exponent)
+        boards.append([[1 << rng.randint(1, top) if rng.random() > 0.33 else 0 for _ in range(4)] for _ in range(4)])
+    return boards
@@ -0,0 +1,37 @@
+from __future__ import annotations
+# The timed search of the Expectimax player: a move for every board that has one, whatever the deadline.
+
+import pytest
+
+from src import bitboard
+from src.ai import Expectimax, SearchAborted
+from src.bitboard import pack
+from tests import baseline
+
+BOARDS = [mas for mas in baseline.random_boards(200, seed=11) if 0 in sum(mas, [])][:60]
+
+def setup_module() -> None:
+    bitboard.build_tables()
+
+@pytest.mark.parametrize("seconds", [0.0, -1.0, 0.001])
+def test_best_move_timed_always_moves(seconds: float) -> None:
+    search = Expectimax(depth=3)
+    for mas in BOARDS:
+        board = pack(mas)
+        direction = search.best_move_timed(board, seconds, max_depth=6)
+        assert direction is not None
+        assert bitboard.move(board, direction)[2]
+        assert search.depth == 3  # The fixed depth comes back after the timed search
+
+# An abort hook that is already set, like a newer hint request, still leaves the move of depth 1
+def test_best_move_timed_with_an_abort_hook() -> None:
+    search = Expectimax(depth=2)
+    search.abort = lambda: True
+    board = pack(BOARDS[0])
+    assert search.best_move_timed(board, 10.0, max_depth=6) == Expectimax(depth=1).best_move(board)
+    with pytest.raises(SearchAborted):
+        search.best_move(board)
+
+def test_best_move_timed_on_stuck_boards() -> None:
+    stuck = [[1 << (1 + (x + y) % 2 + 2 * x) for y in range(4)] for x in range(4)]
+    assert Expectimax().best_move_timed(stuck, 0.0) is None
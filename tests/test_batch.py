@@ -0,0 +1,76 @@
+from __future__ import annotations
+# The NumPy batch engine checked board by board against the packed engine.
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src import bitboard
+from src.batch import BoardBatch
+from src.bitboard import DIRECTIONS, MAX_EXPONENT, pack, unpack
+from tests import baseline
+
+BOARDS = baseline.random_boards(500, seed=7, max_exponent=15)
+
+def setup_module() -> None:
+    bitboard.build_tables()
+
+# Whether no move changes the board, worked out with the packed engine
+def is_over(board: int) -> bool:
+    return all(bitboard.move(board, direction)[0] == board for direction in DIRECTIONS)
+
+def test_from_boards_round_trip() -> None:
+    batch = BoardBatch.from_boards(BOARDS)
+    assert len(batch) == len(BOARDS)
+    assert [batch.board(index) for index in range(len(batch))] == BOARDS
+    assert batch.max_tile().tolist() == [max(max(row) for row in mas) for mas in BOARDS]
+
+# Boards holding 32768 tiles are compared on their exponents, since pack refuses them
+def exponents(mas: list[list[int]]) -> int:
+    return sum((value.bit_length() - 1 if value else 0) << 4 * (4 * x + y) for x, row in enumerate(mas) for y, value in enumerate(row))
+
+@pytest.mark.parametrize("direction", range(len(DIRECTIONS)))
+def test_step_matches_packed_engine(direction: int) -> None:
+    batch = BoardBatch.from_boards(BOARDS)
+    expected = [bitboard.move(exponents(mas), DIRECTIONS[direction]) for mas in BOARDS]
+    legal = batch.legal_moves()
+    over = batch.over.copy()
+    gained, moved, _ = batch.step(np.full(len(batch), direction), spawn=False)
+    for index, (new_board, score, board_moved) in enumerate(expected):
+        if over[index]:
+            assert not moved[index]
+            continue
+        assert exponents(batch.board(index)) == new_board
+        assert gained[index] == score
+        assert moved[index] == legal[index, direction] == board_moved
+    assert batch.score.tolist() == [0 if over[index] else score for index, (_, score, _) in enumerate(expected)]
+
+def test_game_over_matches_packed_engine() -> None:
+    batch = BoardBatch.from_boards(BOARDS)
+    assert batch.over.tolist() == [is_over(exponents(mas)) for mas in BOARDS]
+    # Full boards without a pair, and two 32768 tiles, which never merge
+    stuck = [[[1 << (1 + (x + y) % 2 + 2 * x) for y in range(4)] for x in range(4)]]
+    stuck.append([[1 << MAX_EXPONENT, 1 << MAX_EXPONENT, 4, 2], [2, 4, 2, 4], [4, 2, 4, 2], [2, 4, 2, 4]])
+    assert BoardBatch.from_boards(stuck).over.tolist() == [True, True]
+
+# Played to the end with random moves, every board spawns like GameBoard: one 2 or 4 in an empty cell per move
+def test_play_to_the_end() -> None:
+    rng = np.random.default_rng(3)
+    batch = BoardBatch(64, seed=3)
+    assert ((batch.cells > 0).sum(axis=(1, 2)) == 2).all()
+    for _ in range(3000):
+        if batch.over.all():
+            break
+        before = [pack(batch.board(index)) for index in range(len(batch))]
+        moves = rng.integers(0, len(DIRECTIONS), len(batch))
+        gained, moved, _ = batch.step(moves)
+        for index in np.nonzero(moved)[0]:
+            new_board, score, _ = bitboard.move(before[index], DIRECTIONS[moves[index]])
+            after = unpack(pack(batch.board(index)))
+            spawned = [(x, y) for x in range(4) for y in range(4) if after[x][y] != unpack(new_board)[x][y]]
+            assert len(spawned) == 1
+            assert unpack(new_board)[spawned[0][0]][spawned[0][1]] == 0
+            assert after[spawned[0][0]][spawned[0][1]] in (2, 4)
+            assert gained[index] == score
+    assert batch.over.all()
+    assert all(is_over(pack(batch.board(index))) for index in range(len(batch)))
@@ -0,0 +1,131 @@
+from __future__ import annotations
+# The packed engine and GameBoard checked against the list engine of the first release.
+
+from random import Random
+
+import pytest
+
+from src import bitboard
+from src.bitboard import DIRECTIONS, MAX_EXPONENT, empty_bits, max_exponent, merge_line, pack, select_bit, transpose, unpack
+from src.board import GameBoard, apply_move
+from tests import baseline
+
+BOARDS = baseline.random_boards(2000)
+
+def setup_module() -> None:
+    bitboard.build_tables()
+
+# Every row of the tables against the baseline's left and right moves of a board holding that row.
+# 65536 does not fit in a nibble, so the tables must keep 32768 tiles apart: the baseline gets each
+# of them as a distinct negative number, which it never merges.
+def test_row_tables_match_baseline() -> None:
+    for row in range(65536):
+        exponents = [(row >> (4 * i)) & 0xF for i in range(4)]
+        mas = [[-i - 1 if e == MAX_EXPONENT else 1 << e if e else 0 for i, e in enumerate(exponents)], [0] * 4, [0] * 4, [0] * 4]
+        left, left_score = baseline.move_left(mas)
+        right, right_score = baseline.move_right(mas)
+        left[0] = [1 << MAX_EXPONENT if value < 0 else value for value in left[0]]
+        right[0] = [1 << MAX_EXPONENT if value < 0 else value for value in right[0]]
+        assert unpack(bitboard.ROW_LEFT[row])[0] == left[0]
+        assert bitboard.ROW_SCORE[row] == left_score
+        assert unpack(bitboard.ROW_RIGHT[row])[0] == right[0]
+        assert bitboard.ROW_SCORE_RIGHT[row] == right_score
+
+@pytest.mark.parametrize("direction", DIRECTIONS)
+def test_moves_match_baseline(direction: str) -> None:
+    for mas in BOARDS:
+        expected, expected_score = baseline.MOVES[direction](mas)
+        new_board, score, moved = bitboard.move(pack(mas), direction)
+        assert unpack(new_board) == expected
+        assert score == expected_score
+        assert moved == (expected != mas)
+        assert apply_move(mas, direction) == (expected, expected_score, expected != mas)
+
+def test_pack_round_trip() -> None:
+    for mas in BOARDS:
+        assert unpack(pack(mas)) == mas
+
+@pytest.mark.parametrize("mas", [[[2, 4, 8]] * 3, [[2, 4, 8, 16]] * 5, [[32768, 0, 0, 0]] + [[0] * 4] * 3, [[3, 0, 0, 0]] + [[0] * 4] * 3])
+def test_pack_refuses(mas: list[list[int]]) -> None:
+    with pytest.raises(ValueError):
+        pack(mas)
+
+def test_transpose() -> None:
+    for mas in BOARDS:
+        board = pack(mas)
+        assert unpack(transpose(board)) == [list(column) for column in zip(*mas)]
+        assert transpose(transpose(board)) == board
+
+# merge_line on lines of any length against the baseline's left move of the same tiles
+def test_merge_line() -> None:
+    rng = Random(1)
+    for _ in range(5000):
+        line = [1 << rng.randint(1, 4) if rng.random() > 0.3 else 0 for _ in range(4)]
+        expected, expected_score = baseline.move_left([line, [0] * 4, [0] * 4, [0] * 4])
+        assert merge_line(line) == (expected[0], expected_score)
+    assert merge_line([2, 2, 2, 2, 2, 0, 4]) == ([4, 4, 2, 4, 0, 0, 0], 8)
+    assert merge_line([]) == ([], 0)
+
+def test_select_bit() -> None:
+    rng = Random(2)
+    for _ in range(2000):
+        mask = rng.getrandbits(rng.choice((8, 16, 64, 200)))
+        bits = [i for i in range(mask.bit_length()) if mask >> i & 1]
+        assert [select_bit(mask, k) for k in range(len(bits))] == bits
+        with pytest.raises(ValueError):
+            select_bit(mask, len(bits))
+
+def test_empty_bits_and_max_exponent() -> None:
+    for mas in BOARDS:
+        board = pack(mas)
+        empty = [(x, y) for x in range(4) for y in range(4) if mas[x][y] == 0]
+        assert [divmod(select_bit(empty_bits(board), k) // 4, 4) for k in range(len(empty))] == empty
+        top = max(max(row) for row in mas)
+        assert max_exponent(board) == (top.bit_length() - 1 if top else 0)
+
+# A GameBoard played with moves of the baseline on the side, including boards on a Grid
+@pytest.mark.parametrize("size", [4, 5])
+def test_game_board_matches_baseline(size: int) -> None:
+    rng = Random(size)
+    for seed in range(20):
+        board = GameBoard(seed=seed, size=size)
+        while board.are_there_zeros() and board.can_move():
+            mas = [list(row) for row in board.get_mas]
+            moves = {direction: baseline.MOVES[direction](mas) if size == 4 else apply_move(mas, direction)[:2] for direction in DIRECTIONS}
+            assert board.legal_moves == tuple(direction for direction in DIRECTIONS if moves[direction][0] != mas)
+            assert board.max_tile == max(max(row) for row in mas)
+            direction = rng.choice(DIRECTIONS)
+            assert board.move(direction) == moves[direction][1]
+            assert board.get_mas == moves[direction][0]
+            board.insert_in_mas()
+
+# Cells written through the rows the board hands out are part of the next move
+@pytest.mark.parametrize("size", [4, 5])
+def test_writes_through_rows_reach_the_move(size: int) -> None:
+    board = GameBoard([[0] * size for _ in range(size)], seed=1, size=size)
+    board.get_mas = [[0] * size for _ in range(size)]
+    board[0][0] = 2
+    board[0][1] = 2
+    board.get_mas[1][size - 1] = 4
+    assert board.max_tile == 4
+    assert board.move("LEFT") == 4
+    assert board.get_mas[0][:2] == [4, 0]
+    assert board.get_mas[1][0] == 4
+    for row in board:
+        row[:] = [8] * size
+    assert board.legal_moves == DIRECTIONS
+    assert board.move("UP") == 32 * size  # Every column merges twice
+    assert board.cell(0, 0) == 16
+
+# A move that makes a 32768 moves the board to a Grid, where two of them merge into 65536
+def test_game_board_merges_beyond_the_packed_form() -> None:
+    board = GameBoard(seed=1)
+    board.get_mas = [[16384, 16384, 0, 0], [32768, 0, 0, 0], [0] * 4, [0] * 4]
+    assert board.packed is None
+    board.get_mas = [[16384, 16384, 0, 0], [16384, 16384, 0, 0], [0] * 4, [0] * 4]
+    assert board.move("LEFT") == 2 * 32768
+    assert board.packed is None
+    assert board.get_mas[:2] == [[32768, 0, 0, 0], [32768, 0, 0, 0]]
+    assert board.move("UP") == 65536
+    assert board.get_mas[0][0] == 65536
+    assert board.max_tile == 65536
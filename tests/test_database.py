@@ -0,0 +1,100 @@
+from __future__ import annotations
+# The rating read from and written to a temporary database, never the game's own file.
+
+import io
+import sqlite3
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from src import database
+
+@pytest.fixture
+def db(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Path]:
+    database.close()
+    database.invalidate_leaderboard()
+    path = tmp_path / "2048.sqlite"
+    monkeypatch.setattr(database, "DB_PATH", str(path))
+    yield path
+    database.close()
+    database.invalidate_leaderboard()
+
+# A database from before BEST existed gets it filled from its records when it is opened
+def test_best_is_filled_from_old_records(db: Path) -> None:
+    with sqlite3.connect(db) as connection:
+        connection.execute("create table RECORDS (name text, score integer)")
+        connection.executemany("insert into RECORDS values (?, ?)", [("ann", 100), ("bob", 300), ("ann", 500), (None, 900), ("cid", 300)])
+    connection.close()
+    assert database.get_best() == {
+        1: {"name": "ann", "score": 500},
+        2: {"name": "bob", "score": 300},
+        3: {"name": "cid", "score": 300},
+    }
+    rows = database.get_cursor().execute("select name, score, games, total from BEST order by name").fetchall()
+    assert rows == [("ann", 500, 2, 600), ("bob", 300, 1, 300), ("cid", 300, 1, 300)]
+
+def test_get_best_of_an_empty_rating(db: Path) -> None:
+    assert database.get_best(1) == {"name": None, "score": -1}
+    with pytest.raises(ValueError):
+        database.get_best(4)
+
+# insert_result updates the cached top players right away; the writer thread saves the same rating
+def test_insert_result_updates_the_cache(db: Path) -> None:
+    assert database.get_best(1)["name"] is None  # Fills the cache
+    for name, score in [("ann", 100), ("bob", 300), (None, 1000), ("ann", 500), ("cid", 50), ("dan", 200), ("bob", 10)]:
+        database.insert_result(name, score)
+    cached = database.get_best()
+    assert [(cached[i]["name"], cached[i]["score"]) for i in range(1, 4)] == [("ann", 500), ("bob", 300), ("dan", 200)]
+    database.flush()
+    database.invalidate_leaderboard()
+    assert database.get_best() == cached
+    stats = database.get_player_stats("bob")
+    assert (stats["games"], stats["best"], stats["average"]) == (2, 300, 155.0)
+    assert database.get_cursor().execute("select count(*) from RECORDS").fetchone()[0] == 7
+
+# close saves what is still queued and the next result opens the database again
+def test_close_saves_queued_results(db: Path) -> None:
+    database.insert_result("ann", 40)
+    database.close()
+    with sqlite3.connect(db) as connection:
+        assert connection.execute("select name, score, games, total from BEST").fetchall() == [("ann", 40, 1, 40)]
+    connection.close()
+    database.insert_result("ann", 60)
+    assert database.get_leaderboard() == [("ann", 60)]
+
+# Players with many equal scores, so pages often end in the middle of a tie
+def fill_rating() -> list[tuple[str, int]]:
+    players = [(f"p{index:03d}", 10 * (index % 7)) for index in range(100)]
+    for name, score in players:
+        database.insert_result(name, score)
+    database.flush()
+    return sorted(players, key=lambda player: (-player[1], player[0]))
+
+@pytest.mark.parametrize("page_size", [1, 3, 7, 100, 250])
+def test_pages_follow_each_other(db: Path, page_size: int) -> None:
+    expected = fill_rating()
+    pages = []
+    after = None
+    while page := database.get_leaderboard(page_size, after):
+        pages.extend(page)
+        after = (page[-1][1], page[-1][0])
+    assert pages == expected
+    assert [(name, best) for _, name, best, _, _ in database.iter_leaderboard(page_size)] == expected
+
+def test_rank_shares_places(db: Path) -> None:
+    expected = fill_rating()
+    ranks = {name: rank for rank, name, _, _, _ in database.iter_leaderboard(9)}
+    for name, best in expected:
+        assert database.get_rank(name) == ranks[name] == 1 + sum(other > best for _, other in expected)
+    assert database.get_rank("nobody") is None
+    assert database.get_player_stats("nobody") is None
+    assert database.get_player_stats("p006") == {"name": "p006", "games": 1, "best": 60, "average": 60.0, "rank": 1}
+
+def test_export_leaderboard(db: Path) -> None:
+    database.insert_result("ann", 10)
+    database.insert_result("ann", 30)
+    database.insert_result("bob", 30)
+    file = io.StringIO()
+    database.export_leaderboard(file)
+    assert file.getvalue().splitlines() == ["rank,name,best,games,average", "1,ann,30,2,20.0", "1,bob,30,1,30.0"]
@@ -0,0 +1,82 @@
+from __future__ import annotations
+# The undo ring buffer: wrapping around its capacity, dropping the redo states, packed and exponent boards.
+
+import pytest
+
+from src.board import GameBoard, from_exponents, to_exponents, to_state
+from src.history import History
+
+# Steps back as far as the history goes; returns the boards and scores on the way
+def undo_all(history: History) -> list[tuple[int | bytes, int]]:
+    states = []
+    while history.undo():
+        states.append((history.board, history.score))
+    return states
+
+def test_wraps_around_the_capacity() -> None:
+    history = History(3)
+    history.reset(0, 0)
+    for position in range(1, 11):
+        history.push(position, 10 * position)
+    assert (history.board, history.score) == (10, 100)
+    assert history.previous() == (9, 90)
+    assert history.previous_score() == 90
+    # Only depth moves can be undone, the older states were overwritten
+    assert undo_all(history) == [(9, 90), (8, 80), (7, 70)]
+    assert history.previous() is None
+    assert history.previous_score() is None
+    assert history.redo() and history.redo() and history.redo()
+    assert not history.redo()
+    assert history.board == 10
+
+def test_push_drops_the_redo_states() -> None:
+    history = History(5)
+    history.reset(1, 0)
+    for position in range(2, 6):
+        history.push(position, position)
+    assert history.undo() and history.undo()
+    assert history.can_redo()
+    history.push(42, 7)
+    assert not history.can_redo()
+    assert not history.redo()
+    assert (history.board, history.score) == (42, 7)
+    assert undo_all(history) == [(3, 3), (2, 2), (1, 0)]
+
+def test_reset_forgets_everything() -> None:
+    history = History(2)
+    history.reset(1, 0)
+    history.push(2, 2)
+    history.undo()
+    history.reset(5, 50)
+    assert not history.can_undo() and not history.can_redo()
+    assert (history.board, history.score) == (5, 50)
+
+# A 4x4 board with a tile too large to pack sits in the exponent bytes between packed boards
+def test_packed_and_exponent_boards() -> None:
+    small = [[2, 4, 0, 0], [0] * 4, [0] * 4, [0] * 4]
+    large = [[32768, 2, 0, 0], [0] * 4, [0] * 4, [0] * 4]
+    history = History(3)
+    history.reset(to_state(small), 0)
+    history.push(to_state(large), 4)
+    history.push(to_state(small), 8)
+    assert isinstance(history.board, int)
+    assert history.previous() == (to_exponents(large), 4)
+    board = GameBoard(large, seed=1)
+    history.undo()
+    assert history.packed is None
+    board.load_exponents(*history.board_slice())
+    assert board.rows() == large
+    history.undo()
+    board.load_packed(history.packed)
+    assert board.rows() == small
+    assert board.packed == to_state(small)
+
+def test_boards_of_other_sizes() -> None:
+    rows = [[1 << (x + y) if x + y else 0 for y in range(5)] for x in range(5)]
+    history = History(2, cells=25)
+    history.reset(to_state(rows), 0)
+    assert from_exponents(history.board, 5) == rows
+    with pytest.raises(ValueError):
+        history.push(0, 0)
+    with pytest.raises(ValueError):
+        history.push(bytes(16), 0)
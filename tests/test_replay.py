@@ -0,0 +1,81 @@
+from __future__ import annotations
+# Replays written and read back, and played again to the position of the game they recorded.
+
+from random import Random
+
+import pytest
+
+from src.bitboard import DIRECTIONS
+from src.board import GameBoard, apply_move
+from src.replay import REDO, UNDO, Replay, replay_game
+
+# Plays a seeded game with undos and redos the way App does; returns its replay, final rows and score
+def play(seed: int, steps: int) -> tuple[Replay, list[list[int]], int]:
+    rng = Random(seed)
+    board = GameBoard(seed=seed)
+    replay = Replay(seed, "player")
+    # Every position reached, and the one shown now
+    states = [([list(row) for row in board.get_mas], 0)]
+    current = 0
+    score = 0
+    for _ in range(steps):
+        if not (board.are_there_zeros() and board.can_move()):
+            break
+        choice = rng.random()
+        if choice < 0.2 and (current > 0 if choice < 0.1 else current + 1 < len(states)):
+            current += -1 if choice < 0.1 else 1
+            if choice < 0.1:
+                replay.record_undo()
+            else:
+                replay.record_redo()
+            mas, score = states[current]
+            board.get_mas = [list(row) for row in mas]
+            continue
+        side = rng.choice(DIRECTIONS)
+        new_mas, gained, moved = apply_move(board.get_mas, side)
+        if moved:
+            board.get_mas, board.is_board_move = new_mas, True
+            board.insert_in_mas()
+            score += gained
+            replay.record(side)
+            del states[current + 1:]
+            states.append(([list(row) for row in board.get_mas], score))
+            current += 1
+    replay.score = score
+    return replay, [list(row) for row in board.get_mas], score
+
+@pytest.mark.parametrize("seed", range(10))
+def test_round_trip(seed: int) -> None:
+    replay, mas, score = play(seed, 300)
+    data = replay.to_bytes()
+    loaded = Replay.from_bytes(data)
+    assert (loaded.seed, loaded.user, loaded.score) == (replay.seed, replay.user, replay.score)
+    assert loaded.steps() == replay.steps()
+    assert loaded.to_bytes() == data
+    state = replay_game(loaded)
+    assert state.board == mas
+    assert state.score == score
+    assert state.moves == len(replay.moves)
+
+def test_steps_keep_the_order() -> None:
+    replay = Replay(1)
+    replay.record("UP")
+    replay.record_undo()
+    replay.record_redo()
+    replay.record("LEFT")
+    replay.record_undo()
+    assert Replay.from_bytes(replay.to_bytes()).steps() == ["UP", UNDO, REDO, "LEFT", UNDO]
+
+def test_replay_game_stops_after_upto() -> None:
+    replay, _, _ = play(4, 50)
+    assert replay_game(replay, len(replay)) == replay_game(replay)
+    assert replay_game(replay, 0).moves == 0
+
+@pytest.mark.parametrize("cut", [0, 10, -1])
+def test_from_bytes_refuses_broken_data(cut: int) -> None:
+    replay, _, _ = play(5, 40)
+    data = replay.to_bytes()
+    with pytest.raises(ValueError):
+        Replay.from_bytes(data[:cut])
+    with pytest.raises(ValueError):
+        Replay.from_bytes(b"XXXX" + data[4:])
@@ -0,0 +1,61 @@
+from __future__ import annotations
+# Snapshots packed and read back, and the records they refuse.
+
+import struct
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+from src.snapshot import HEADER, USERNAME_BYTES, Autosaver, Snapshot, pack_snapshot, unpack_snapshot, write_atomic
+
+BOARD = [[2, 4, 0, 0], [0, 8, 0, 0], [0, 0, 16384, 0], [0, 0, 0, 32768]]
+UNDO_BOARD = [[2, 4, 0, 0], [0, 8, 0, 0], [0, 0, 16384, 0], [0, 0, 16384, 16384]]
+
+@pytest.mark.parametrize("snapshot", [
+    Snapshot(BOARD, 70000, "player", 200, UNDO_BOARD, 37232),
+    Snapshot(BOARD, 0, None, 241, None, 0),
+    Snapshot([[1 << (x + y) if x + y else 0 for y in range(5)] for x in range(5)], 12, "five", -1, None, 3),
+])
+def test_round_trip(snapshot: Snapshot) -> None:
+    data = pack_snapshot(snapshot)
+    blocks = len(snapshot.board)
+    assert len(data) == HEADER.size + 2 * blocks * blocks
+    assert unpack_snapshot(data) == snapshot
+
+# Long names are cut to the field, never in the middle of a character
+def test_long_user_names() -> None:
+    name = "ä" * USERNAME_BYTES
+    user = unpack_snapshot(pack_snapshot(Snapshot(BOARD, 0, name, 0, None, 0))).user
+    assert user == "ä" * (USERNAME_BYTES // 2)
+
+@pytest.mark.parametrize("damage", [
+    lambda data: data[:10],
+    lambda data: data[:-1],
+    lambda data: data + b"\0",
+    lambda data: b"XXXX" + data[4:],
+    lambda data: data[:4] + bytes([2]) + data[5:],
+    lambda data: data[:5] + bytes([1]) + data[6:],
+])
+def test_unpack_refuses_broken_records(damage: Callable[[bytes], bytes]) -> None:
+    data = pack_snapshot(Snapshot(BOARD, 1, "player", 100, UNDO_BOARD, 0))
+    with pytest.raises(ValueError):
+        unpack_snapshot(damage(data))
+
+def test_header_layout() -> None:
+    data = pack_snapshot(Snapshot(BOARD, 5, "a", 7, None, 9))
+    assert struct.unpack_from("<4sBB", data) == (b"TTFE", 1, 4)
+
+def test_write_atomic_and_autosaver(tmp_path: Path) -> None:
+    path = tmp_path / "saves" / "game.ttfe"
+    write_atomic(path, b"old")
+    write_atomic(path, b"new")
+    assert path.read_bytes() == b"new"
+    assert [file.name for file in path.parent.iterdir()] == ["game.ttfe"]
+    autosaver = Autosaver(path, 60)
+    autosaver.submit(b"latest")
+    assert path.read_bytes() == b"new"  # Submitted states are only written by the thread or save_now
+    autosaver.save_now(b"closing")
+    assert path.read_bytes() == b"closing"
+    autosaver.discard()
+    assert not path.exists()
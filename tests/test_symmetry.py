@@ -0,0 +1,64 @@
+from __future__ import annotations
+# The symmetry maps checked against rotations and reflections of the list boards.
+
+from random import Random
+
+import pytest
+
+from src import bitboard
+from src.bitboard import DIRECTIONS, pack, unpack
+from src.board import apply_move
+from src.symmetry import BACKWARD, FLIP, FORWARD, MIRROR, SYMMETRIES, TRANSPOSE, BoardKey, canonical, transform, variants
+
+# Returns random 4x4 boards of small tiles, which merge often
+def random_boards(count: int, seed: int) -> list[list[list[int]]]:
+    rng = Random(seed)
+    return [[[1 << rng.randint(1, 6) if rng.random() > 0.33 else 0 for _ in range(4)] for _ in range(4)] for _ in range(count)]
+
+BOARDS = random_boards(500, seed=3)
+
+def setup_module() -> None:
+    bitboard.build_tables()
+
+# The symmetry worked out on the rows, step by step in the order transform applies them
+def transform_rows(mas: list[list[int]], symmetry: int) -> list[list[int]]:
+    if symmetry & TRANSPOSE:
+        mas = [list(column) for column in zip(*mas)]
+    if symmetry & MIRROR:
+        mas = [row[::-1] for row in mas]
+    if symmetry & FLIP:
+        mas = mas[::-1]
+    return [list(row) for row in mas]
+
+@pytest.mark.parametrize("symmetry", SYMMETRIES)
+def test_transform(symmetry: int) -> None:
+    for mas in BOARDS:
+        assert unpack(transform(pack(mas), symmetry)) == transform_rows(mas, symmetry)
+
+def test_variants_and_canonical() -> None:
+    for mas in BOARDS:
+        board = pack(mas)
+        boards = variants(board)
+        assert boards == tuple(transform(board, symmetry) for symmetry in SYMMETRIES)
+        assert canonical(board) == min(boards)
+        # Every variant has the same canonical form and an equal key
+        assert {canonical(variant) for variant in boards} == {min(boards)}
+        assert len({BoardKey.of(variant) for variant in boards}) == 1
+
+# Moving the transformed board in the mapped direction gives the transformed result of the move
+@pytest.mark.parametrize("symmetry", SYMMETRIES)
+def test_direction_maps(symmetry: int) -> None:
+    for mas in BOARDS:
+        for direction in DIRECTIONS:
+            moved, score, _ = apply_move(mas, direction)
+            mapped = FORWARD[symmetry][direction]
+            assert apply_move(transform_rows(mas, symmetry), mapped)[:2] == (transform_rows(moved, symmetry), score)
+            assert BACKWARD[symmetry][mapped] == direction
+
+def test_board_key() -> None:
+    for mas in BOARDS:
+        key = BoardKey.of(mas)
+        assert key.rows() == unpack(canonical(pack(mas)))
+        assert unpack(transform(pack(mas), key.symmetry)) == key.rows()
+        for direction in DIRECTIONS:
+            assert key.to_original(key.to_canonical(direction)) == direction
@@ -0,0 +1,102 @@
+"""Plays many headless games across a process pool and reports the results.
+
+Example: python tournament.py --games 100000 --policy greedy --output results.csv
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import random
+import sys
+import time
+from functools import partial
+from multiprocessing import Pool
+from typing import NamedTuple
+
+from src.ai import build_heuristic
+from src.bitboard import build_tables
+from src.board import GameBoard
+from src.policies import POLICIES, make_policy, policy_options
+
+FIELDS = ("game", "score", "max_tile", "moves", "seconds")
+
+class GameResult(NamedTuple):
+    game: int
+    score: int
+    max_tile: int
+    moves: int
+    seconds: float
+
+# Fills the lookup tables once per worker so that they do not count towards game times
+def init_worker(policy_name: str) -> None:
+    build_tables()
+    if policy_name == "expectimax":
+        build_heuristic()
+
+# Plays one complete game with the same rules and end condition as App.run, without the timer
+def play_game(policy_name: str, seed: int, options: dict, game: int) -> GameResult:
+    start = time.perf_counter()
+    # Every game gets its own streams for spawning tiles and for the policy
+    policy = make_policy(policy_name, random.Random(f"{seed}-{game}-policy"), **options)
+    board = GameBoard(rng=random.Random(f"{seed}-{game}"))
+    score = moves = 0
+    while board.are_there_zeros() and board.can_move():
+        side = policy(board.get_mas)
+        if side is None:
+            break
+        gained = board.move(side)
+        board.insert_in_mas()
+        score += gained
+        moves += 1
+    max_tile = max(max(row) for row in board)
+    return GameResult(game, score, max_tile, moves, time.perf_counter() - start)
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=1000, help="number of games to play")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random", help="move policy")
+    parser.add_argument("--depth", type=int, help="search depth of the expectimax policy")
+    parser.add_argument("--rollouts", type=int, help="random games per move of the montecarlo policy")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of processes")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--output", default="tournament_results.csv", help="CSV file for per-game results")
+    args = parser.parse_args(argv)
+    # An option the policy does not take would only fail later, inside a worker
+    for option in ("depth", "rollouts"):
+        if getattr(args, option) is not None and option not in policy_options(args.policy):
+            parser.error(f"--{option} does not apply to the {args.policy} policy")
+    return args
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    options = {}
+    if args.depth is not None:
+        options["depth"] = args.depth
+    if args.rollouts is not None:
+        options["rollouts"] = args.rollouts
+    play = partial(play_game, args.policy, args.seed, options)
+    chunksize = max(1, min(64, args.games // (args.workers * 8)))
+
+    scores = []
+    max_tiles: dict[int, int] = {}
+    start = time.perf_counter()
+    with open(args.output, "w", newline="") as file, Pool(args.workers, init_worker, (args.policy,)) as pool:
+        writer = csv.writer(file)
+        writer.writerow(FIELDS)
+        for result in pool.imap_unordered(play, range(args.games), chunksize=chunksize):
+            writer.writerow((result.game, result.score, result.max_tile, result.moves, f"{result.seconds:.6f}"))
+            scores.append(result.score)
+            max_tiles[result.max_tile] = max_tiles.get(result.max_tile, 0) + 1
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(scores)} games with policy {args.policy!r} on {args.workers} workers in {elapsed:.2f} s")
+    print(f"throughput: {len(scores) / elapsed:.1f} games/sec")
+    if scores:
+        print(f"score: mean {sum(scores) / len(scores):.1f}, best {max(scores)}")
+        for tile in sorted(max_tiles):
+            print(f"max tile {tile}: {max_tiles[tile] / len(scores):.1%}")
+    print(f"results written to {args.output}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()